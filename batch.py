@@ -0,0 +1,220 @@
+"""
+Batch solving through a persistent process pool.
+
+Usage:
+    python batch.py [-w WORKERS] [-c CHUNKSIZE] [-e ENGINE] [--unordered] [--stats] [PUZZLE ...]
+
+Puzzles are read from the command line, or one per line from stdin when none
+are given. Each solution is printed as an 81-char string, or 'unsolvable'.
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import queue
+import sys
+
+import solution
+from stats import SolverStats
+
+# Engine and topology used by solve_grid inside each worker process, set by _init_worker
+_engine = 'bitmask'
+_topology = None
+
+
+def solve_grid(grid, engine='bitmask', topology=None, stats=None):
+    """
+    Solve a single grid and return the solution as an 81-char string.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        engine(string): the engine name passed on to `solution.solve`.
+        topology(Topology): board layout, defaults to 9x9 diagonal sudoku.
+        stats(SolverStats): optional stats.SolverStats for strategy and search counters.
+    Returns:
+        The solved grid string. False if no solution exists.
+    """
+    if engine == 'bitmask':
+        import bitboard
+        return bitboard.solve_grid(grid, topology, stats)
+    values = solution.solve(grid, engine, topology=topology, stats=stats)
+    if not values:
+        return False
+    return ''.join(values[box] for box in (topology.boxes if topology else solution.boxes))
+
+
+def _solve_grids(grids, engine, topology, stats):
+    """Solve a list of grids, all at once for the vectorized 'numpy' engine."""
+    if engine == 'numpy':
+        import vectorized
+        return vectorized.solve_batch(grids, topology, stats)
+    return [solve_grid(grid, engine, topology, stats) for grid in grids]
+
+
+def _init_worker(engine, topology):
+    """Pool initializer: pick the engine and topology once per worker."""
+    global _engine, _topology
+    _engine = engine
+    # Unpickling the topology already built its tables through get_topology
+    _topology = topology
+    if engine == 'bitmask':
+        import bitboard
+
+
+def _solve_chunk(chunk, collect_stats=False):
+    """
+    Solve a (start index, [grid, ...]) chunk inside a worker.
+    Returns:
+        (start index, [solution, ...], SolverStats or None)
+    """
+    start, grids = chunk
+    stats = SolverStats() if collect_stats else None
+    return start, _solve_grids(grids, _engine, _topology, stats), stats
+
+
+def _chunks(grids, chunksize):
+    """Group an iterable of grids into (start index, [grid, ...]) chunks."""
+    chunk = []
+    start = 0
+    for grid in grids:
+        chunk.append(grid)
+        if len(chunk) == chunksize:
+            yield start, chunk
+            start += chunksize
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+class SolverPool(object):
+    """
+    A pool of solver processes that stays alive across solve_many calls.
+
+    Args:
+        workers(int): number of worker processes, defaults to the CPU count.
+            With a single worker the puzzles are solved in this process.
+        engine(string): the engine name passed on to `solution.solve`, or 'numpy'
+            to propagate each chunk as one array with vectorized.py.
+        topology(Topology): board layout, defaults to 9x9 diagonal sudoku.
+        backlog(int): chunks kept in flight per worker, which bounds memory use
+            when the input is a long stream.
+    """
+
+    def __init__(self, workers=None, engine='bitmask', topology=None, backlog=4):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.engine = engine
+        self.topology = topology
+        self.backlog = backlog
+        self._pool = None
+        if self.workers > 1:
+            self._pool = multiprocessing.Pool(self.workers, _init_worker, (engine, topology))
+
+    def solve_many(self, grids, chunksize=64, ordered=True, stats=None):
+        """
+        Solve an iterable of grids, reading it lazily.
+        Args:
+            grids(iterable): grid strings.
+            chunksize(int): number of grids sent to a worker at a time.
+            ordered(bool): yield results in input order, or as soon as each chunk completes.
+            stats(SolverStats): optional stats.SolverStats that the counters of every
+                worker are merged into as chunks complete.
+        Yields:
+            (index, solution) pairs, where solution is an 81-char string or False.
+        """
+        collect = stats is not None
+        if self._pool is None:
+            results = ((start, _solve_grids(chunk, self.engine, self.topology, stats), None)
+                       for start, chunk in _chunks(grids, chunksize))
+        elif ordered:
+            results = self._imap_ordered(grids, chunksize, collect)
+        else:
+            results = self._imap_unordered(grids, chunksize, collect)
+        for start, solved, chunk_stats in results:
+            if chunk_stats is not None:
+                stats.merge(chunk_stats)
+            for offset, result in enumerate(solved):
+                yield start + offset, result
+
+    def _imap_ordered(self, grids, chunksize, collect):
+        pending = collections.deque()
+        limit = self.workers * self.backlog
+        for chunk in _chunks(grids, chunksize):
+            pending.append(self._pool.apply_async(_solve_chunk, (chunk, collect)))
+            if len(pending) >= limit:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def _imap_unordered(self, grids, chunksize, collect):
+        done = queue.Queue()
+        in_flight = 0
+        limit = self.workers * self.backlog
+        for chunk in _chunks(grids, chunksize):
+            self._pool.apply_async(_solve_chunk, (chunk, collect), callback=done.put, error_callback=done.put)
+            in_flight += 1
+            if in_flight >= limit:
+                yield _unwrap(done.get())
+                in_flight -= 1
+        while in_flight:
+            yield _unwrap(done.get())
+            in_flight -= 1
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+def _unwrap(result):
+    """Re-raise a worker exception delivered through the unordered result queue."""
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def solve_many(grids, workers=None, chunksize=64, ordered=True, engine='bitmask', topology=None, stats=None):
+    """
+    Solve an iterable of grids on a temporary SolverPool.
+    Yields:
+        (index, solution) pairs, where solution is an 81-char string or False.
+    """
+    with SolverPool(workers, engine, topology) as pool:
+        for item in pool.solve_many(grids, chunksize, ordered, stats):
+            yield item
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve many diagonal sudoku puzzles in parallel.')
+    parser.add_argument('puzzles', nargs='*', help='81-char puzzle strings; read from stdin if omitted')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('-c', '--chunksize', type=int, default=64, help='puzzles per worker task')
+    parser.add_argument('-e', '--engine', default='bitmask', help='solver engine (default: bitmask)')
+    parser.add_argument('--unordered', action='store_true', help='print "index solution" as results complete')
+    parser.add_argument('--stats', action='store_true', help='print solver counters as JSON to stderr')
+    args = parser.parse_args(argv)
+
+    stats = SolverStats() if args.stats else None
+    grids = args.puzzles or (line.strip() for line in sys.stdin if line.strip())
+    for i, result in solve_many(grids, args.workers, args.chunksize, not args.unordered, args.engine, stats=stats):
+        result = result or 'unsolvable'
+        if args.unordered:
+            print(i, result)
+        else:
+            print(result)
+    if stats is not None:
+        json.dump(stats.summary(), sys.stderr, indent=2, sort_keys=True)
+        sys.stderr.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import batch
+import unittest
+
+import solution_test
+
+
+def relabel(grid, shift):
+    """Rotate the digits of a grid, which keeps it a valid diagonal sudoku."""
+    return ''.join(str((int(c) - 1 + shift) % 9 + 1) if c.isdigit() else c for c in grid)
+
+
+class TestSolveMany(unittest.TestCase):
+    grids = [relabel(solution_test.TestDiagonalSudoku.diagonal_grid, shift) for shift in range(9)]
+    grids.insert(3, '11' + '.' * 79)
+
+    def expected(self):
+        return [(i, batch.solve_grid(grid)) for i, grid in enumerate(self.grids)]
+
+    def test_solve_grid(self):
+        solved = solution_test.TestDiagonalSudoku.solved_diag_sudoku
+        expected = ''.join(solved[box] for box in batch.solution.boxes)
+        self.assertEqual(batch.solve_grid(self.grids[0]), expected)
+        self.assertEqual(batch.solve_grid(self.grids[0], engine='strings'), expected)
+        self.assertFalse(batch.solve_grid(self.grids[3]))
+
+    def test_single_worker(self):
+        self.assertEqual(list(batch.solve_many(self.grids, workers=1)), self.expected())
+
+    def test_pool_ordered(self):
+        with batch.SolverPool(workers=2) as pool:
+            self.assertEqual(list(pool.solve_many(iter(self.grids), chunksize=3)), self.expected())
+            # the pool is reusable across calls
+            self.assertEqual(list(pool.solve_many(self.grids[:2], chunksize=1)), self.expected()[:2])
+
+    def test_pool_unordered(self):
+        results = batch.solve_many(self.grids, workers=2, chunksize=2, ordered=False)
+        self.assertEqual(sorted(results, key=lambda item: item[0]), self.expected())
+
+
+if __name__ == '__main__':
+    unittest.main()
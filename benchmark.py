@@ -0,0 +1,315 @@
+"""
+Benchmark the solver engines on the bundled puzzle corpora.
+
+Usage:
+    python benchmark.py [-e ENGINE ...] [-c CORPUS ...] [-n LIMIT] [-o RESULTS.json]
+                        [--compare BASELINE.json] [--tolerance 0.1]
+    python benchmark.py --cold-start [-e ENGINE ...] [--runs RUNS] [-o RESULTS.json]
+
+For every corpus and engine this reports puzzles/sec, p50/p99 latency, search
+nodes and peak traced memory. Results can be saved as JSON and compared
+against an earlier run; the exit status is 1 when a regression is found.
+
+--cold-start instead times `import solution; solution.solve(grid)` in fresh
+interpreters, the cost a short-lived process pays before its first answer.
+Those timings include loading bytecode, so they are only representative when
+__pycache__ is populated (python -m compileall .) and PYTHONDONTWRITEBYTECODE
+is not keeping it empty.
+
+The corpora live in puzzles/, one puzzle per line, with a '# topology:'
+header line saying whether the diagonal units apply.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import solution
+from stats import SolverStats
+from topology import get_topology
+
+here = os.path.dirname(os.path.abspath(__file__))
+corpus_dir = os.path.join(here, 'puzzles')
+corpora = ('easy', 'hard', '17clue', 'diagonal')
+engines = ('strings', 'bitmask', 'pipeline', 'dlx', 'numpy')
+# Engines of solution.solve, the ones a cold start can load
+cold_start_engines = ('strings', 'bitmask', 'dlx')
+
+topologies = {
+    'diagonal': get_topology(3, diagonals=True),
+    'standard': get_topology(3, diagonals=False),
+}
+
+
+def load_corpus(name):
+    """
+    Read a bundled corpus.
+    Returns:
+        (grids, topology) for the puzzles in puzzles/<name>.txt.
+    """
+    grids = []
+    topo = topologies['diagonal']
+    with open(os.path.join(corpus_dir, name + '.txt')) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('# topology:'):
+                topo = topologies[line.split(':', 1)[1].strip()]
+            elif line and not line.startswith('#'):
+                grids.append(line)
+    return grids, topo
+
+
+def _solve_one(engine, grid, topo, stats):
+    """Solve one grid with an engine, returning whether it found a solution."""
+    if engine == 'bitmask':
+        import bitboard
+        return bool(bitboard.solve_grid(grid, topo, stats))
+    if engine == 'pipeline':
+        # The bitmask engine with the extra strategies of strategies.default_pipeline
+        import bitboard
+        import strategies
+        return bool(bitboard.solve_grid(grid, topo, stats, strategies.default_pipeline))
+    if engine == 'dlx':
+        import dlx
+        return bool(dlx.solve(grid, topo, stats))
+    return bool(solution.solve(grid, stats=stats))
+
+
+def supports(engine, topo):
+    """Whether an engine can run a corpus: the dictionary engine only knows 9x9 diagonal sudoku."""
+    if engine == 'numpy':
+        import vectorized
+        if vectorized.np is None:
+            return False
+    return engine != 'strings' or topo is topologies['diagonal']
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def _run(engine, grids, topo):
+    """Time every puzzle, returning (latencies, total seconds, solved, SolverStats)."""
+    if engine == 'numpy':
+        import vectorized
+        start = time.perf_counter()
+        solved = sum(1 for result in vectorized.solve_batch(grids, topo) if result)
+        # The batch engine has no per-puzzle latency or node count
+        return [], time.perf_counter() - start, solved, None
+    stats = SolverStats()
+    latencies = []
+    solved = 0
+    start = time.perf_counter()
+    for grid in grids:
+        t0 = time.perf_counter()
+        solved += _solve_one(engine, grid, topo, stats)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start, solved, stats
+
+
+def run_engine(engine, grids, topo):
+    """
+    Benchmark one engine on a list of grids.
+    Returns:
+        A dictionary of measurements, with None for those the engine cannot report.
+    """
+    latencies, seconds, solved, stats = _run(engine, grids, topo)
+    # Measure memory on a second pass so tracing does not skew the timings
+    tracemalloc.start()
+    try:
+        _run(engine, grids, topo)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    latencies.sort()
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    return {
+        'puzzles': len(grids),
+        'solved': solved,
+        'seconds': seconds,
+        'puzzles_per_sec': len(grids) / seconds if seconds else None,
+        'p50_ms': p50 * 1000 if p50 is not None else None,
+        'p99_ms': p99 * 1000 if p99 is not None else None,
+        'nodes': stats and stats.nodes,
+        'peak_kb': peak / 1024.0,
+        'stats': stats and stats.summary(),
+    }
+
+
+def run(engine_names=engines, corpus_names=corpora, limit=None, out=sys.stdout):
+    """
+    Benchmark every engine on every corpus, printing a table as it goes.
+    Returns:
+        {'meta': {...}, 'results': {corpus: {engine: measurements}}}
+    """
+    results = {}
+    out.write('%-9s %-8s %9s %9s %9s %9s %10s\n' % ('corpus', 'engine', 'puzzles/s', 'p50 ms', 'p99 ms', 'nodes', 'peak KB'))
+    for corpus in corpus_names:
+        grids, topo = load_corpus(corpus)
+        grids = grids[:limit]
+        results[corpus] = {}
+        for engine in engine_names:
+            if not supports(engine, topo):
+                continue
+            r = results[corpus][engine] = run_engine(engine, grids, topo)
+            out.write('%-9s %-8s %9s %9s %9s %9s %10.0f\n' % (
+                corpus, engine, _fmt(r['puzzles_per_sec']), _fmt(r['p50_ms']), _fmt(r['p99_ms']),
+                '-' if r['nodes'] is None else r['nodes'], r['peak_kb']))
+            if r['solved'] < r['puzzles']:
+                out.write('WARNING %s/%s solved only %d of %d puzzles\n' % (corpus, engine, r['solved'], r['puzzles']))
+    meta = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'limit': limit,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def unsolved(current):
+    """
+    Find the engines of a run that did not solve their whole corpus.
+    Returns:
+        A list of human readable messages, empty when every puzzle was solved.
+    """
+    return ['%s/%s: solved %d of %d puzzles' % (corpus, engine, r['solved'], r['puzzles'])
+            for corpus, engines_ in sorted(current['results'].items())
+            for engine, r in sorted(engines_.items()) if r['solved'] < r['puzzles']]
+
+
+def _fmt(value):
+    return '-' if value is None else '%.2f' % value
+
+
+# Run in a fresh interpreter by cold_start; prints its timings as JSON
+_cold_start_script = """
+import time
+start = time.perf_counter()
+import solution
+imported = time.perf_counter()
+solution.solve(%r, engine=%r)
+solved = time.perf_counter()
+import json, sys
+print(json.dumps({'import_ms': (imported - start) * 1000, 'solve_ms': (solved - imported) * 1000,
+                  'modules': len(sys.modules), 'pygame': 'pygame' in sys.modules}))
+"""
+
+
+def cold_start(engine_names=cold_start_engines, runs=10, grid=None, out=sys.stdout):
+    """
+    Time importing solution.py and solving one puzzle in fresh interpreters.
+    Args:
+        runs(int): interpreters started per engine.
+        grid(string): the puzzle, defaults to the first of the diagonal corpus.
+    Returns:
+        {'meta': {...}, 'cold_start': {engine: measurements}} with the p50 and worst
+        time of the whole process, of `import solution` and of the first solve.
+    """
+    grid = grid or load_corpus('diagonal')[0][0]
+    results = {}
+    out.write('%-8s %10s %10s %10s %10s %8s\n' % ('engine', 'process ms', 'worst ms', 'import ms', 'solve ms', 'modules'))
+    for engine in engine_names:
+        runs_ = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            child = subprocess.run([sys.executable, '-c', _cold_start_script % (grid, engine)],
+                                   cwd=here, stdout=subprocess.PIPE, check=True)
+            run_ = json.loads(child.stdout.decode('ascii'))
+            run_['process_ms'] = (time.perf_counter() - start) * 1000
+            runs_.append(run_)
+
+        def p50(name):
+            return percentile(sorted(r[name] for r in runs_), 0.5)
+
+        r = results[engine] = {
+            'runs': runs,
+            'process_ms': p50('process_ms'),
+            'worst_ms': max(r['process_ms'] for r in runs_),
+            'import_ms': p50('import_ms'),
+            'solve_ms': p50('solve_ms'),
+            'modules': runs_[-1]['modules'],
+            'pygame': any(r['pygame'] for r in runs_),
+        }
+        out.write('%-8s %10.1f %10.1f %10.2f %10.2f %8d\n' % (
+            engine, r['process_ms'], r['worst_ms'], r['import_ms'], r['solve_ms'], r['modules']))
+    meta = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return {'meta': meta, 'cold_start': results}
+
+
+def compare(baseline, current, tolerance=0.1):
+    """
+    Compare two benchmark runs.
+    Args:
+        tolerance(float): relative slowdown allowed before it counts as a regression.
+    Returns:
+        A list of human readable regression messages, empty when there are none.
+        Unsolved puzzles in `current` always count, whatever the baseline solved.
+    """
+    regressions = unsolved(current)
+    for corpus, engines_ in current['results'].items():
+        for engine, new in engines_.items():
+            old = baseline['results'].get(corpus, {}).get(engine)
+            if old is None or old['puzzles'] != new['puzzles']:
+                # Only runs over the same puzzles are comparable
+                continue
+            name = '%s/%s' % (corpus, engine)
+            if old['puzzles_per_sec'] and new['puzzles_per_sec'] is not None \
+                    and new['puzzles_per_sec'] < old['puzzles_per_sec'] * (1 - tolerance):
+                regressions.append('%s: %.1f -> %.1f puzzles/sec' % (name, old['puzzles_per_sec'], new['puzzles_per_sec']))
+            if old['p99_ms'] and new['p99_ms'] is not None and new['p99_ms'] > old['p99_ms'] * (1 + tolerance):
+                regressions.append('%s: p99 %.2f -> %.2f ms' % (name, old['p99_ms'], new['p99_ms']))
+            # Node counts are deterministic, so any increase is a change in search behaviour
+            if old['nodes'] is not None and new['nodes'] is not None and new['nodes'] > old['nodes']:
+                regressions.append('%s: %d -> %d search nodes' % (name, old['nodes'], new['nodes']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the sudoku solver engines.')
+    parser.add_argument('-e', '--engine', action='append', choices=engines, help='engine to run (default: all)')
+    parser.add_argument('-c', '--corpus', action='append', choices=corpora, help='corpus to run (default: all)')
+    parser.add_argument('-n', '--limit', type=int, default=None, help='only use the first N puzzles of each corpus')
+    parser.add_argument('-o', '--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown (default: 0.1)')
+    parser.add_argument('--cold-start', action='store_true', help='time importing the solver and a first solve instead')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per engine for --cold-start (default: 10)')
+    args = parser.parse_args(argv)
+
+    if args.cold_start:
+        if args.compare:
+            parser.error('--compare does not apply to --cold-start')
+        unsupported = set(args.engine or ()) - set(cold_start_engines)
+        if unsupported:
+            parser.error('--cold-start runs the engines of solution.solve: %s' % ', '.join(cold_start_engines))
+        current = cold_start(args.engine or cold_start_engines, args.runs)
+    else:
+        current = run(args.engine or engines, args.corpus or corpora, args.limit)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), current, args.tolerance)
+        for message in regressions:
+            print('REGRESSION ' + message)
+        if regressions:
+            sys.exit(1)
+        print('no regressions')
+    elif not args.cold_start and unsolved(current):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
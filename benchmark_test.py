@@ -0,0 +1,62 @@
+import benchmark
+import copy
+import io
+import unittest
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_corpora(self):
+        for name in benchmark.corpora:
+            grids, topo = benchmark.load_corpus(name)
+            self.assertGreaterEqual(len(grids), 50)
+            self.assertTrue(all(len(grid) == 81 for grid in grids))
+        self.assertIs(benchmark.load_corpus('easy')[1], benchmark.topologies['standard'])
+        self.assertIs(benchmark.load_corpus('diagonal')[1], benchmark.topologies['diagonal'])
+        self.assertTrue(all(grid.count('.') == 81 - 17 for grid in benchmark.load_corpus('17clue')[0]))
+
+    def test_run(self):
+        current = benchmark.run(['strings', 'bitmask'], ['easy', 'diagonal'], limit=3, out=io.StringIO())
+        self.assertNotIn('strings', current['results']['easy'])
+        r = current['results']['diagonal']['bitmask']
+        self.assertEqual((r['puzzles'], r['solved']), (3, 3))
+        self.assertGreaterEqual(r['nodes'], 3)
+        self.assertLessEqual(r['p50_ms'], r['p99_ms'])
+        self.assertGreaterEqual(current['results']['diagonal']['strings']['nodes'], 3)
+
+    def test_compare(self):
+        baseline = benchmark.run(['bitmask'], ['easy'], limit=3, out=io.StringIO())
+        self.assertEqual(benchmark.compare(baseline, baseline), [])
+        slower = copy.deepcopy(baseline)
+        r = slower['results']['easy']['bitmask']
+        r['puzzles_per_sec'] /= 2
+        r['nodes'] += 1
+        self.assertEqual(len(benchmark.compare(baseline, slower)), 2)
+
+    def test_unsolved(self):
+        current = benchmark.run(['bitmask'], ['easy'], limit=3, out=io.StringIO())
+        self.assertEqual(benchmark.unsolved(current), [])
+        failed = copy.deepcopy(current)
+        failed['results']['easy']['bitmask']['solved'] = 2
+        self.assertEqual(benchmark.unsolved(failed), ['easy/bitmask: solved 2 of 3 puzzles'])
+        # Reported even against a baseline that failed the same way
+        self.assertEqual(benchmark.compare(failed, failed), ['easy/bitmask: solved 2 of 3 puzzles'])
+        solve_one, benchmark._solve_one = benchmark._solve_one, lambda engine, grid, topo, stats: False
+        out = io.StringIO()
+        try:
+            benchmark.run(['bitmask'], ['easy'], limit=3, out=out)
+        finally:
+            benchmark._solve_one = solve_one
+        self.assertIn('WARNING easy/bitmask solved only 0 of 3 puzzles', out.getvalue())
+
+    def test_cold_start(self):
+        current = benchmark.cold_start(['strings', 'bitmask'], runs=1, out=io.StringIO())
+        for engine in ('strings', 'bitmask'):
+            r = current['cold_start'][engine]
+            self.assertGreater(r['process_ms'], r['import_ms'] + r['solve_ms'])
+            # Solving never loads the visualization stack
+            self.assertFalse(r['pygame'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,454 @@
+"""
+Bitmask board engine for the diagonal sudoku solver.
+
+The board is a flat list of integers, one per box in `topo.boxes` order.
+Bit d-1 of a box's mask is set when digit d is still a candidate, so
+'123456789' becomes 0b111111111 and a solved '5' becomes 0b000010000.
+Peers and units come from the precomputed index tables of a
+`topology.Topology`, so no 'A1'-style names are touched while solving.
+Every function takes an optional `topo` and defaults to the 9x9 diagonal
+sudoku of solution.py. Search functions also take an optional `pipeline` of
+further strategies from strategies.py to run whenever propagation stalls.
+"""
+import strategies
+from stats import clock
+from topology import diagonal
+
+# Tables of the default topology, kept for callers that only solve 9x9 diagonal sudoku
+digits = diagonal.digits
+all_digits = diagonal.all_digits
+boxes = diagonal.boxes
+box_index = diagonal.box_index
+unit_table = diagonal.unit_table
+units_of = diagonal.units_of
+peer_table = diagonal.peer_table
+bit_count = diagonal.bit_count
+mask_digits = diagonal.mask_digits
+digit_mask = diagonal.digit_mask
+
+
+def grid_masks(grid, topo=None):
+    """
+    Convert grid into a list of candidate masks.
+    Args:
+        grid(string) - A grid in string form, using '.' or '0' for empty boxes.
+    Returns:
+        A list of masks in `boxes` order, with `all_digits` for empty boxes.
+    """
+    topo = topo or diagonal
+    digit_mask, all_digits = topo.digit_mask, topo.all_digits
+    if len(grid) != len(topo.boxes):
+        raise ValueError('expected a grid of %d boxes, got %d' % (len(topo.boxes), len(grid)))
+    return [digit_mask.get(c, all_digits) for c in grid]
+
+
+def values_to_masks(values, topo=None):
+    """
+    Convert a values dictionary into a list of candidate masks.
+    Args:
+        values(dict): a dictionary of the form {'box_name': '123456789', ...}
+    Returns:
+        A list of masks in `boxes` order.
+    """
+    topo = topo or diagonal
+    masks = []
+    for box in topo.boxes:
+        m = 0
+        for d in values[box]:
+            m |= topo.digit_mask[d]
+        masks.append(m)
+    return masks
+
+
+def masks_to_values(masks, topo=None):
+    """
+    Convert a list of candidate masks back into a values dictionary.
+    Args:
+        masks(list): a list of candidate masks
+    Returns:
+        A dictionary of the form {'box_name': '123456789', ...}
+    """
+    topo = topo or diagonal
+    mask_digits = topo.mask_digits
+    return dict(zip(topo.boxes, [mask_digits[m] for m in masks]))
+
+
+def masks_to_grid(masks, topo=None):
+    """
+    Convert a list of solved masks into a grid string, with '.' for unsolved boxes.
+    """
+    topo = topo or diagonal
+    mask_digits, bit_count = topo.mask_digits, topo.bit_count
+    return ''.join(mask_digits[m] if bit_count[m] == 1 else '.' for m in masks)
+
+
+def eliminate(masks, topo=None):
+    """Remove the value of every solved box from its peers."""
+    topo = topo or diagonal
+    for i, m in enumerate(masks):
+        if topo.bit_count[m] == 1:
+            for p in topo.peer_table[i]:
+                masks[p] &= ~m
+    return masks
+
+
+def only_choice(masks, topo=None):
+    """Assign a digit to a box when it is the only place for that digit in a unit."""
+    topo = topo or diagonal
+    for unit in topo.unit_table:
+        # Digits seen at least once and at least twice in the unit
+        once = twice = 0
+        for i in unit:
+            twice |= once & masks[i]
+            once |= masks[i]
+        singles = once & ~twice
+        if singles:
+            for i in unit:
+                hit = masks[i] & singles
+                if hit and topo.bit_count[hit] == 1:
+                    masks[i] = hit
+    return masks
+
+
+def naked_twins(masks, topo=None):
+    """Eliminate the digits of every naked twin pair from the rest of its unit."""
+    topo = topo or diagonal
+    for unit in topo.unit_table:
+        pairs = [masks[i] for i in unit if topo.bit_count[masks[i]] == 2]
+        for twin in set(m for m in pairs if pairs.count(m) == 2):
+            for i in unit:
+                if masks[i] != twin:
+                    masks[i] &= ~twin
+    return masks
+
+
+def propagate(masks, changed=None, topo=None, stats=None):
+    """
+    Propagate constraints outward from the boxes in `changed` until nothing else changes.
+
+    Solved boxes are eliminated from their peers, and every unit that contains a
+    changed box is checked for hidden singles (only_choice) and naked twins. Only
+    boxes and units touched by a change are revisited, so the work done is
+    proportional to the number of changes rather than to the board size.
+    Args:
+        masks(list): the board, updated in place.
+        changed(iterable): indexes of boxes whose masks changed. None means every box.
+        stats(SolverStats): optional stats.SolverStats that receives the calls, time
+            and candidates removed of each strategy.
+    Returns:
+        The board, or False as soon as a box or a unit runs out of candidates.
+    """
+    topo = topo or diagonal
+    peer_table, units_of, unit_table = topo.peer_table, topo.units_of, topo.unit_table
+    bit_count, all_digits = topo.bit_count, topo.all_digits
+    cells = list(range(len(masks)) if changed is None else changed)
+    dirty = set()
+    timed = stats is not None
+    # Calls, seconds and candidates removed per strategy, flushed into stats on return
+    e_calls = e_time = e_removed = 0
+    o_calls = o_time = o_removed = 0
+    t_calls = t_time = t_removed = 0
+    try:
+        while True:
+            if timed:
+                t0 = clock()
+            while cells:
+                i = cells.pop()
+                m = masks[i]
+                if m & (m - 1) == 0:
+                    # Solved box: eliminate its digit from the peers
+                    e_calls += 1
+                    for p in peer_table[i]:
+                        pm = masks[p]
+                        if pm & m:
+                            pm ^= m
+                            e_removed += 1
+                            if not pm:
+                                return False
+                            masks[p] = pm
+                            cells.append(p)
+                dirty.update(units_of[i])
+            if timed:
+                t1 = clock()
+                e_time += t1 - t0
+            if not dirty:
+                return masks
+            unit = unit_table[dirty.pop()]
+
+            # Only choice: digits that appear exactly once in the unit
+            o_calls += 1
+            once = twice = 0
+            for i in unit:
+                m = masks[i]
+                twice |= once & m
+                once |= m
+            if once != all_digits:
+                return False
+            singles = once & ~twice
+            if singles:
+                for i in unit:
+                    hit = masks[i] & singles
+                    if hit and masks[i] != hit:
+                        if hit & (hit - 1):
+                            # Two digits can only go in this one box
+                            return False
+                        o_removed += bit_count[masks[i]] - 1
+                        masks[i] = hit
+                        cells.append(i)
+            if timed:
+                t0 = clock()
+                o_time += t0 - t1
+
+            # Naked twins: two boxes with the same pair of candidates
+            t_calls += 1
+            pairs = {}
+            for i in unit:
+                m = masks[i]
+                if bit_count[m] != 2:
+                    continue
+                j = pairs.setdefault(m, i)
+                if j == i:
+                    continue
+                for k in unit:
+                    if k != i and k != j and masks[k] & m:
+                        t_removed += bit_count[masks[k] & m]
+                        masks[k] &= ~m
+                        if not masks[k]:
+                            return False
+                        cells.append(k)
+            if timed:
+                t_time += clock() - t0
+    finally:
+        if timed:
+            stats.strategy('eliminate').add(e_calls, e_time, e_removed)
+            stats.strategy('only_choice').add(o_calls, o_time, o_removed)
+            stats.strategy('naked_twins').add(t_calls, t_time, t_removed)
+
+
+def reduce_puzzle(masks, topo=None, stats=None, pipeline=()):
+    """
+    Propagate constraints from every box until the board stops changing.
+    Args:
+        pipeline(iterable): names of strategies.registry strategies to try, in
+            order, whenever propagation stalls.
+    Returns:
+        The reduced list of masks, or False if a box ran out of candidates.
+    """
+    return _refine(masks, None, topo or diagonal, stats, strategies.resolve(pipeline))
+
+
+def _refine(masks, changed, topo, stats, pipeline):
+    """
+    Propagate from the changed boxes, then run the resolved pipeline until no
+    strategy finds anything more.
+    """
+    bit_count = topo.bit_count
+    while True:
+        if not propagate(masks, changed, topo, stats):
+            return False
+        for name, strategy in pipeline:
+            if stats is None:
+                changed = strategy(masks, topo)
+            else:
+                before = sum(bit_count[m] for m in masks)
+                start = clock()
+                changed = strategy(masks, topo)
+                removed = before - sum(bit_count[m] for m in masks) if changed else 0
+                stats.strategy(name).add(1, clock() - start, removed)
+            if changed is False:
+                return False
+            if changed:
+                break
+        else:
+            return masks
+
+
+def _bits(m):
+    """The single-digit masks of a candidate mask, lowest digit first."""
+    bits = []
+    while m:
+        bit = m & -m
+        bits.append(bit)
+        m ^= bit
+    return bits
+
+
+def least_constraining(masks, i, topo):
+    """Order the candidates of box i so the one that rules out the fewest peer candidates comes first."""
+    peers = topo.peer_table[i]
+    return sorted(_bits(masks[i]), key=lambda bit: sum(1 for p in peers if masks[p] & bit))
+
+
+def random_order(masks, i, topo):
+    """Order the candidates of box i at random."""
+    import random
+    bits = _bits(masks[i])
+    random.shuffle(bits)
+    return bits
+
+
+# Value ordering heuristics for search, by name
+value_orders = {'lcv': least_constraining, 'random': random_order}
+
+
+def _value_order(order):
+    """Resolve an `order` argument to None (lowest digit first) or a function(masks, i, topo)."""
+    if order is None or callable(order):
+        return order
+    try:
+        return value_orders[order]
+    except KeyError:
+        raise ValueError('Unknown value order: %r, expected one of %s' % (order, ', '.join(sorted(value_orders))))
+
+
+def search(masks, topo=None, stats=None, dead=None, pipeline=(), order=None):
+    """
+    Reduce the board and then branch on the unsolved box with the fewest candidates.
+    Args:
+        stats(SolverStats): optional stats.SolverStats for strategy and search counters.
+        dead(LRUCache): optional cache.LRUCache of boards, as tuples of masks, known
+            to have no solution. Branches found there are skipped, and branches
+            that fail are added to it.
+        pipeline(iterable): names of extra strategies to run at every node, as in `reduce_puzzle`.
+        order: the order to try the candidates of a box in. None for lowest digit first, a
+            name from `value_orders` ('lcv' or 'random'), or a function(masks, i, topo)
+            returning single-digit masks.
+    Returns:
+        The solved list of masks, or False if no solution exists.
+    """
+    topo = topo or diagonal
+    pipeline = strategies.resolve(pipeline)
+    order = _value_order(order)
+    if stats is not None:
+        start = clock()
+    result = _refine(masks, None, topo, stats, pipeline)
+    if result is not False:
+        result = _search(result, topo, stats, 0, dead, pipeline, order)
+    if stats is not None:
+        stats.finish(clock() - start, result)
+    return result
+
+
+def _search(masks, topo, stats, depth, dead=None, pipeline=(), order=None):
+    """Branch on a fully propagated board, propagating only from the box that was set."""
+    if stats is not None:
+        stats.node(depth)
+    bit_count = topo.bit_count
+    # Choose one of the unfilled boxes with the fewest possibilities
+    unsolved = [(bit_count[m], i) for i, m in enumerate(masks) if bit_count[m] > 1]
+    if not unsolved:
+        return masks
+    n, i = min(unsolved)
+    for bit in (_bits(masks[i]) if order is None else order(masks, i, topo)):
+        branch = list(masks)
+        branch[i] = bit
+        if _refine(branch, (i,), topo, stats, pipeline):
+            if dead is None:
+                attempt = _search(branch, topo, stats, depth + 1, None, pipeline, order)
+            else:
+                key = tuple(branch)
+                attempt = key not in dead and _search(branch, topo, stats, depth + 1, dead, pipeline, order)
+                if not attempt:
+                    dead.add(key)
+            if attempt:
+                return attempt
+        if stats is not None:
+            stats.backtrack(depth)
+    return False
+
+
+def count_solutions(masks, limit=2, topo=None, stats=None, dead=None, pipeline=()):
+    """
+    Count the solutions of a board, stopping early once `limit` have been found.
+    Args:
+        masks(list): the board, reduced in place.
+        limit(int): stop counting at this many solutions, at least 1. None counts them all.
+        stats(SolverStats): optional stats.SolverStats for strategy and search counters.
+        dead(LRUCache): optional cache.LRUCache of boards with no solution, as in `search`.
+        pipeline(iterable): names of extra strategies to run at every node, as in `reduce_puzzle`.
+    Returns:
+        The number of solutions found, at most `limit`.
+    """
+    _check_limit(limit)
+    topo = topo or diagonal
+    pipeline = strategies.resolve(pipeline)
+    if stats is not None:
+        start = clock()
+    count = 0
+    masks = _refine(masks, None, topo, stats, pipeline)
+    if masks is not False:
+        count = _count(masks, limit, topo, stats, 0, dead, pipeline)
+    if stats is not None:
+        stats.finish(clock() - start, count)
+    return count
+
+
+def _check_limit(limit):
+    """Reject a solution limit that could not be met, which the search would overshoot instead."""
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be at least 1 or None to count every solution, got %r' % (limit,))
+
+
+def _count(masks, limit, topo, stats, depth, dead=None, pipeline=()):
+    """Count the solutions below a fully propagated board."""
+    if stats is not None:
+        stats.node(depth)
+    bit_count = topo.bit_count
+    unsolved = [(bit_count[m], i) for i, m in enumerate(masks) if bit_count[m] > 1]
+    if not unsolved:
+        return 1
+    n, i = min(unsolved)
+    count = 0
+    m = masks[i]
+    while m:
+        bit = m & -m
+        m ^= bit
+        branch = list(masks)
+        branch[i] = bit
+        if _refine(branch, (i,), topo, stats, pipeline):
+            key = None if dead is None else tuple(branch)
+            if key is not None and key in dead:
+                found = 0
+            else:
+                found = _count(branch, None if limit is None else limit - count, topo, stats, depth + 1, dead, pipeline)
+                if not found and key is not None:
+                    dead.add(key)
+            count += found
+            if limit is not None and count >= limit:
+                break
+        else:
+            found = 0
+        if not found and stats is not None:
+            stats.backtrack(depth)
+    return count
+
+
+def solve_grid(grid, topo=None, stats=None, pipeline=(), order=None):
+    """
+    Find the solution to a Sudoku grid and return it as a grid string.
+    Returns:
+        The solved grid string. False if no solution exists.
+    """
+    masks = search(grid_masks(grid, topo), topo, stats, None, pipeline, order)
+    if masks is False:
+        return False
+    return masks_to_grid(masks, topo)
+
+
+def solve(grid, topo=None, stats=None, pipeline=(), order=None):
+    """
+    Find the solution to a Sudoku grid using the bitmask engine.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        topo(Topology): the board layout, defaults to 9x9 diagonal sudoku.
+        stats(SolverStats): optional stats.SolverStats for strategy and search counters.
+        pipeline(iterable): names of strategies.registry strategies to run whenever
+            propagation stalls, e.g. strategies.default_pipeline.
+        order: value ordering for search, e.g. 'lcv' or 'random'.
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    masks = search(grid_masks(grid, topo), topo, stats, None, pipeline, order)
+    if masks is False:
+        return False
+    return masks_to_values(masks, topo)
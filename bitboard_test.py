@@ -0,0 +1,88 @@
+import benchmark
+import bitboard
+import solution
+import unittest
+
+import solution_test
+
+
+class TestConversion(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = dict(solution_test.TestNakedTwins.before_naked_twins_1)
+        self.assertEqual(bitboard.masks_to_values(bitboard.values_to_masks(values)), values)
+
+    def test_grid_masks_blanks(self):
+        masks = bitboard.grid_masks('0' + '.' * 79 + '5')
+        self.assertEqual(masks[0], bitboard.all_digits)
+        self.assertEqual(masks[1], bitboard.all_digits)
+        self.assertEqual(masks[80], bitboard.digit_mask['5'])
+
+    def test_peer_table(self):
+        for box in solution.boxes:
+            i = bitboard.box_index[box]
+            self.assertEqual(set(bitboard.boxes[p] for p in bitboard.peer_table[i]), solution.peers[box])
+
+
+class TestBitmaskEngine(unittest.TestCase):
+
+    def test_naked_twins(self):
+        masks = bitboard.values_to_masks(solution_test.TestNakedTwins.before_naked_twins_2)
+        values = bitboard.masks_to_values(bitboard.naked_twins(masks))
+        self.assertTrue(values in solution_test.TestNakedTwins.possible_solutions_2)
+
+    def test_solve(self):
+        self.assertEqual(bitboard.solve(solution_test.TestDiagonalSudoku.diagonal_grid), solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_strings_engine_agrees(self):
+        # Every puzzle of the diagonal corpus is unique, so both engines must find the same solution
+        grids, topo = benchmark.load_corpus('diagonal')
+        for grid in grids:
+            self.assertEqual(solution.solve(grid, engine='strings'), bitboard.solve(grid, topo), grid)
+
+    def test_solve_engine(self):
+        self.assertEqual(solution.solve(solution_test.TestDiagonalSudoku.diagonal_grid, engine='bitmask'),
+                         solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_propagate_matches_full_sweeps(self):
+        masks = bitboard.grid_masks(solution_test.TestDiagonalSudoku.diagonal_grid)
+        swept = list(masks)
+        while True:
+            before = list(swept)
+            bitboard.naked_twins(bitboard.only_choice(bitboard.eliminate(swept)))
+            if swept == before:
+                break
+        propagated = bitboard.propagate(list(masks))
+        # The worklist never keeps a candidate that the full sweeps removed
+        for p, s in zip(propagated, swept):
+            self.assertEqual(p & ~s, 0)
+
+    def test_propagate_contradiction(self):
+        masks = bitboard.grid_masks(solution_test.TestDiagonalSudoku.diagonal_grid)
+        # A1 is a given 2; putting 2 in A2 as well empties A1 immediately
+        masks[1] = bitboard.digit_mask['2']
+        self.assertFalse(bitboard.propagate(masks, [1]))
+
+    def test_unsolvable(self):
+        # Two 1s in the first row
+        self.assertFalse(bitboard.solve('11' + '.' * 79))
+
+    def test_value_orders(self):
+        grid = solution_test.TestDiagonalSudoku.diagonal_grid
+        for order in ('lcv', 'random', lambda masks, i, topo: reversed(bitboard._bits(masks[i]))):
+            self.assertEqual(bitboard.solve(grid, order=order), solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+        with self.assertRaises(ValueError):
+            bitboard.solve(grid, order='mcv')
+
+    def test_least_constraining(self):
+        masks = bitboard.grid_masks('.' * 81)
+        # Only 9 is left as a candidate in the rest of row A, so it rules out the most
+        for i in range(1, 9):
+            masks[i] = bitboard.digit_mask['9']
+        masks[0] = bitboard.digit_mask['1'] | bitboard.digit_mask['9']
+        self.assertEqual(bitboard.least_constraining(masks, 0, bitboard.diagonal),
+                         [bitboard.digit_mask['1'], bitboard.digit_mask['9']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+"""
+Transposition cache for repeated and symmetric puzzles.
+
+Puzzles are reduced to a canonical form before solving: the smallest string
+over every symmetry of the board that keeps its units intact, with digits
+relabelled in order of first appearance. For diagonal sudoku those symmetries
+are transposition, mirroring the columns, and permuting rows and columns
+together by a band-preserving permutation that commutes with reversal, which
+keeps both diagonals on the diagonals.
+
+A TranspositionCache remembers solved puzzles, both verbatim (so exact
+duplicates skip canonicalization) and in canonical form, and the canonical
+partial boards that search proved to be dead ends. Because every search runs
+in the canonical frame, dead ends found for one puzzle are recognised in any
+symmetric copy of it, as well as further down the same search tree.
+"""
+import collections
+import itertools
+
+import bitboard
+from topology import diagonal
+
+
+class LRUCache(object):
+    """
+    A bounded mapping that evicts the least recently used entry.
+
+    Args:
+        maxsize(int): the most entries kept. 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def add(self, key):
+        """Store a key with no value, for caches used as sets."""
+        self.put(key, True)
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self.data.clear()
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+        }
+
+
+def _line_permutations(box_size):
+    """
+    Yield the permutations of row (or column) indexes that keep bands together
+    and commute with reversal, so they map both diagonals onto themselves.
+    """
+    b = box_size
+    n = b * b
+    inner = list(itertools.permutations(range(b)))
+    for bands in itertools.permutations(range(b)):
+        if any(bands[b - 1 - k] != b - 1 - bands[k] for k in range(b)):
+            continue
+        for within in itertools.product(inner, repeat=b):
+            if any(within[b - 1 - k][b - 1 - j] != b - 1 - within[k][j] for k in range(b) for j in range(b)):
+                continue
+            yield tuple(bands[i // b] * b + within[i // b][i % b] for i in range(n))
+
+
+# Symmetry transforms already built, keyed by topology
+_symmetries = {}
+
+
+def symmetries(topo=None):
+    """
+    Return the symmetry transforms of a topology, as tuples mapping each box of
+    the transformed board to the box it is read from.
+
+    The full diagonal-preserving group (96 transforms on 9x9) is used for boards
+    of up to 9x9 without windoku or extra units. Larger boards and windoku only
+    use transposition, and boards with extra units only the identity.
+    """
+    topo = topo or diagonal
+    transforms = _symmetries.get(topo)
+    if transforms is None:
+        n = topo.size
+        if topo.extra_units:
+            lines = [tuple(range(n))]
+            mirrors, transposes = (False,), (False,)
+        elif topo.windoku or topo.box_size > 3:
+            lines = [tuple(range(n))]
+            mirrors, transposes = (False,), (False, True)
+        else:
+            lines = list(_line_permutations(topo.box_size))
+            mirrors, transposes = (False, True), (False, True)
+        found = set()
+        for p in lines:
+            for mirror in mirrors:
+                q = tuple(n - 1 - c for c in p) if mirror else p
+                for transpose in transposes:
+                    if transpose:
+                        found.add(tuple(q[c] * n + p[r] for r in range(n) for c in range(n)))
+                    else:
+                        found.add(tuple(p[r] * n + q[c] for r in range(n) for c in range(n)))
+        transforms = _symmetries[topo] = sorted(found)
+    return transforms
+
+
+def canonical_form(grid, topo=None):
+    """
+    Reduce a grid to its canonical form.
+    Args:
+        grid(string): a grid using '.' or '0' for empty boxes.
+    Returns:
+        (canonical grid, transform, labels): `canonical[i]` relabels the digit
+        `grid[transform[i]]`, and `labels` lists the original digit of each
+        canonical digit in order, so a canonical solution maps back to the grid.
+    """
+    topo = topo or diagonal
+    digits = topo.digits
+    grid = ''.join(c if c in topo.digit_mask else '.' for c in grid)
+    best = None
+    for transform in symmetries(topo):
+        s = ''.join(map(grid.__getitem__, transform))
+        seen = ''.join(dict.fromkeys(s.replace('.', '')))
+        candidate = s.translate(str.maketrans(seen, digits[:len(seen)]))
+        if best is None or candidate < best[0]:
+            best = (candidate, transform, seen)
+    canonical, transform, seen = best
+    # Pair any digits missing from the givens with the unused canonical labels
+    labels = seen + ''.join(d for d in digits if d not in seen)
+    return canonical, transform, labels
+
+
+def restore(canonical_solution, transform, labels, topo=None):
+    """Map a solution of a canonical grid back onto the original grid."""
+    topo = topo or diagonal
+    relabelled = canonical_solution.translate(str.maketrans(topo.digits, labels))
+    solution = [None] * len(transform)
+    for i, box in enumerate(transform):
+        solution[box] = relabelled[i]
+    return ''.join(solution)
+
+
+class TranspositionCache(object):
+    """
+    Cache solved puzzles and dead-end search states across solves.
+
+    Args:
+        maxsize(int): the most solved puzzles kept.
+        dead_maxsize(int): the most dead-end partial boards kept.
+        topo(Topology): board layout, defaults to 9x9 diagonal sudoku.
+    """
+
+    def __init__(self, maxsize=10000, dead_maxsize=100000, topo=None):
+        self.topo = topo or diagonal
+        self.exact = LRUCache(maxsize)
+        self.solved = LRUCache(maxsize)
+        self.dead = LRUCache(dead_maxsize)
+
+    def solve_grid(self, grid, stats=None):
+        """
+        Solve a grid through the cache.
+        Returns:
+            The solved grid string. False if no solution exists.
+        """
+        topo = self.topo
+        result = self.exact.get(grid)
+        if result is None:
+            canonical, transform, labels = canonical_form(grid, topo)
+            result = self.solved.get(canonical)
+            if result is None:
+                masks = bitboard.search(bitboard.grid_masks(canonical, topo), topo, stats, self.dead)
+                result = masks and bitboard.masks_to_grid(masks, topo)
+                self.solved.put(canonical, result)
+                stats = None
+            if result is not False:
+                result = restore(result, transform, labels, topo)
+            self.exact.put(grid, result)
+        if stats is not None:
+            # A cache hit still counts as a solve, just a very fast one
+            stats.finish(0.0, result)
+        return result
+
+    def solve(self, grid, stats=None):
+        """
+        Solve a grid through the cache.
+        Returns:
+            The dictionary representation of the final sudoku grid. False if no solution exists.
+        """
+        result = self.solve_grid(grid, stats)
+        if result is False:
+            return False
+        return dict(zip(self.topo.boxes, result))
+
+    def clear(self):
+        self.exact.clear()
+        self.solved.clear()
+        self.dead.clear()
+
+    def summary(self):
+        """Hit rates, sizes and evictions of each cache."""
+        return {'exact': self.exact.summary(), 'solved': self.solved.summary(), 'dead': self.dead.summary()}
@@ -0,0 +1,109 @@
+import bitboard
+import solution
+import solution_test
+import unittest
+
+from cache import LRUCache, TranspositionCache, canonical_form, restore, symmetries
+from stats import SolverStats
+from topology import diagonal, get_topology
+from topology_test import is_valid
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        # 'b' is now the least recently used entry
+        cache.put('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+        summary = cache.summary()
+        self.assertEqual((summary['hits'], summary['misses'], summary['evictions']), (1, 1, 1))
+        self.assertAlmostEqual(summary['hit_rate'], 0.5)
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.put('a', 1)
+        self.assertEqual(len(cache), 0)
+
+
+class TestCanonicalForm(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_symmetries_keep_units(self):
+        self.assertEqual(len(symmetries()), 96)
+        for topo in (diagonal, get_topology(2), get_topology(3, windoku=True)):
+            units = set(frozenset(u) for u in topo.unit_table)
+            for transform in symmetries(topo):
+                for unit in topo.unit_table:
+                    self.assertIn(frozenset(transform[i] for i in unit), units)
+
+    def test_symmetric_puzzles_match(self):
+        canonical = canonical_form(self.grid)[0]
+        for transform in symmetries()[::7]:
+            moved = ''.join(self.grid[i] for i in transform)
+            relabelled = moved.translate(str.maketrans('123456789', '864297351'))
+            self.assertEqual(canonical_form(relabelled)[0], canonical)
+
+    def test_restore(self):
+        canonical, transform, labels = canonical_form(self.grid)
+        solved = bitboard.solve_grid(canonical)
+        self.assertEqual(restore(solved, transform, labels), bitboard.solve_grid(self.grid))
+
+    def test_other_topologies(self):
+        self.assertEqual(len(symmetries(get_topology(3, windoku=True))), 2)
+        self.assertEqual(len(symmetries(get_topology(2))), 16)
+
+
+class TestTranspositionCache(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_hits_on_symmetric_puzzle(self):
+        cache = TranspositionCache()
+        expected = bitboard.solve_grid(self.grid)
+        self.assertEqual(cache.solve_grid(self.grid), expected)
+        transposed = ''.join(self.grid[c * 9 + r] for r in range(9) for c in range(9))
+        stats = SolverStats()
+        result = cache.solve_grid(transposed, stats)
+        self.assertTrue(is_valid(result, diagonal))
+        self.assertEqual(stats.nodes, 0)
+        self.assertEqual(cache.summary()['solved']['hits'], 1)
+        # Exact duplicates are answered before canonicalization
+        self.assertEqual(cache.solve_grid(self.grid), expected)
+        self.assertEqual(cache.summary()['exact']['hits'], 1)
+
+    def test_unsolvable(self):
+        cache = TranspositionCache()
+        self.assertFalse(cache.solve_grid('11' + '.' * 79))
+        self.assertFalse(cache.solve_grid('.' * 79 + '99'))
+
+    def test_dead_states(self):
+        cache = TranspositionCache(maxsize=0)
+        grid = '2' + '.' * 80
+        self.assertTrue(is_valid(cache.solve_grid(grid), diagonal))
+        self.assertEqual(bitboard.count_solutions(bitboard.grid_masks('11' + '.' * 79), dead=cache.dead), 0)
+        masks = bitboard.reduce_puzzle(bitboard.grid_masks(grid))
+        # Mark every first move as a dead end and search has nowhere left to go
+        i = min((bin(m).count('1'), i) for i, m in enumerate(masks) if bin(m).count('1') > 1)[1]
+        m = masks[i]
+        while m:
+            branch = list(masks)
+            branch[i] = m & -m
+            m &= m - 1
+            if bitboard.propagate(branch, (i,)):
+                cache.dead.add(tuple(branch))
+        self.assertFalse(bitboard.search(list(masks), dead=cache.dead))
+
+    def test_solution_solve(self):
+        cache = TranspositionCache()
+        self.assertEqual(solution.solve(self.grid, engine='bitmask', cache=cache),
+                         solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, cache=cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
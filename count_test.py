@@ -0,0 +1,40 @@
+import bitboard
+import solution
+import solution_test
+import unittest
+
+
+class TestSolutionCount(unittest.TestCase):
+    diagonal_grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_unique(self):
+        self.assertEqual(solution.count_solutions(self.diagonal_grid), 1)
+        self.assertTrue(solution.is_unique(self.diagonal_grid))
+
+    def test_limit(self):
+        # A grid with a single given has many solutions
+        grid = '2' + '.' * 80
+        self.assertEqual(solution.count_solutions(grid), 2)
+        self.assertEqual(solution.count_solutions(grid, limit=5), 5)
+        self.assertFalse(solution.is_unique(grid))
+
+    def test_no_solution(self):
+        self.assertEqual(solution.count_solutions('11' + '.' * 79), 0)
+        self.assertFalse(solution.is_unique('11' + '.' * 79))
+
+    def test_count_all(self):
+        solved = ''.join(solution_test.TestDiagonalSudoku.solved_diag_sudoku[box] for box in solution.boxes)
+        # A single blank box always has exactly one completion
+        grid = '.' + solved[1:]
+        self.assertEqual(solution.count_solutions(grid, limit=None), 1)
+
+    def test_bad_limit(self):
+        for limit in (0, -1):
+            with self.assertRaises(ValueError):
+                solution.count_solutions('.' * 81, limit=limit)
+            with self.assertRaises(ValueError):
+                bitboard.count_solutions(bitboard.grid_masks('.' * 81), limit)
+
+
+if __name__ == '__main__':
+    unittest.main()
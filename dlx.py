@@ -0,0 +1,138 @@
+"""
+Exact cover (Algorithm X) engine for the diagonal sudoku solver.
+
+Every candidate placement "digit d in box b" is a row of the exact cover
+matrix. The columns are the constraints that must each be covered exactly
+once: every box holds one digit, and every unit of the topology (rows,
+columns, squares and, for diagonal sudoku, both diagonals) holds each digit
+once.
+Columns are kept as sets of rows, so covering and uncovering a column is
+the set version of Knuth's dancing links.
+
+Matrices are built once per `topology.Topology` and cached.
+"""
+from stats import clock
+from topology import diagonal
+
+# Exact cover matrices already built, keyed by topology
+_matrices = {}
+
+
+def _matrix(topo):
+    """
+    Return the exact cover matrix of a topology as (row_columns, column_rows).
+
+    Row r = box index * size + digit index. Columns 0 to len(boxes) - 1 are
+    "box i is filled", and len(boxes) + u * size + d is "unit u contains digit d".
+    """
+    matrix = _matrices.get(topo)
+    if matrix is None:
+        size, nboxes = topo.size, len(topo.boxes)
+        row_columns = tuple(tuple([i] + [nboxes + u * size + d for u in topo.units_of[i]])
+                            for i in range(nboxes) for d in range(size))
+        column_rows = {}
+        for r, cols in enumerate(row_columns):
+            for c in cols:
+                column_rows.setdefault(c, set()).add(r)
+        matrix = _matrices[topo] = (row_columns, column_rows)
+    return matrix
+
+
+# Rows of the default 9x9 diagonal matrix
+row_columns = _matrix(diagonal)[0]
+
+
+def _select(X, row_columns, r):
+    """Cover every column satisfied by row r, returning the removed columns."""
+    removed = []
+    for j in row_columns[r]:
+        for i in X[j]:
+            for k in row_columns[i]:
+                if k != j:
+                    X[k].remove(i)
+        removed.append(X.pop(j))
+    return removed
+
+
+def _deselect(X, row_columns, r, removed):
+    """Undo `_select`, restoring the columns in reverse order."""
+    for j in reversed(row_columns[r]):
+        X[j] = removed.pop()
+        for i in X[j]:
+            for k in row_columns[i]:
+                if k != j:
+                    X[k].add(i)
+
+
+def _algorithm_x(X, row_columns, chosen, stats, depth):
+    """Yield every exact cover of the remaining columns, extending `chosen`."""
+    if stats is not None:
+        stats.node(depth)
+    if not X:
+        yield chosen
+        return
+    # Branch on the column with the fewest rows left
+    c = min(X, key=lambda c: len(X[c]))
+    for r in list(X[c]):
+        chosen.append(r)
+        removed = _select(X, row_columns, r)
+        found = False
+        for cover in _algorithm_x(X, row_columns, chosen, stats, depth + 1):
+            found = True
+            yield cover
+        if not found and stats is not None:
+            stats.backtrack(depth)
+        _deselect(X, row_columns, r, removed)
+        chosen.pop()
+
+
+def solutions(grid, topo=None, stats=None):
+    """
+    Yield every solution of a Sudoku grid.
+    Args:
+        grid(string): a string representing a sudoku grid, with '.' or '0' for empty boxes.
+        topo(Topology): the board layout, defaults to 9x9 diagonal sudoku.
+        stats(SolverStats): optional stats.SolverStats for search counters.
+    Yields:
+        The dictionary representation of each solved grid.
+    """
+    topo = topo or diagonal
+    row_columns, column_rows = _matrix(topo)
+    size, digits, boxes = topo.size, topo.digits, topo.boxes
+    if len(grid) != len(boxes):
+        raise ValueError('expected a grid of %d boxes, got %d' % (len(boxes), len(grid)))
+    X = dict((c, set(rows)) for c, rows in column_rows.items())
+    chosen = []
+    for i, c in enumerate(grid):
+        d = digits.find(c)
+        if d < 0:
+            continue
+        r = i * size + d
+        if any(j not in X or r not in X[j] for j in row_columns[r]):
+            # The given clashes with an earlier given
+            return
+        chosen.append(r)
+        _select(X, row_columns, r)
+    for cover in _algorithm_x(X, row_columns, chosen, stats, 0):
+        values = {}
+        for r in cover:
+            values[boxes[r // size]] = digits[r % size]
+        yield values
+
+
+def solve(grid, topo=None, stats=None):
+    """
+    Find the solution to a Sudoku grid using exact cover.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        topo(Topology): the board layout, defaults to 9x9 diagonal sudoku.
+        stats(SolverStats): optional stats.SolverStats for search counters.
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    if stats is not None:
+        start = clock()
+    result = next(solutions(grid, topo, stats), False)
+    if stats is not None:
+        stats.finish(clock() - start, result)
+    return result
@@ -0,0 +1,33 @@
+import dlx
+import solution
+import unittest
+
+import solution_test
+
+
+class TestExactCover(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_solve(self):
+        self.assertEqual(dlx.solve(self.grid), solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_solve_engine(self):
+        self.assertEqual(solution.solve(self.grid, engine='dlx'), solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_matrix_includes_diagonals(self):
+        # Rows are box * 9 + digit: filled box + row + column + square, plus each diagonal through the box.
+        # A1 is on the main diagonal only, A2 on neither and E5 on both.
+        self.assertEqual(len(dlx.row_columns[0]), 1 + 3 + 1)
+        self.assertEqual(len(dlx.row_columns[9]), 1 + 3)
+        self.assertEqual(len(dlx.row_columns[40 * 9]), 1 + 3 + 2)
+
+    def test_clashing_givens(self):
+        self.assertFalse(dlx.solve('11' + '.' * 79))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, engine='nope')
+
+
+if __name__ == '__main__':
+    unittest.main()
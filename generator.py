@@ -0,0 +1,192 @@
+"""
+Generate diagonal sudoku puzzles with a unique solution, graded by difficulty.
+
+Usage:
+    python generator.py [-n COUNT] [-s SEED] [-w WORKERS] [--max-grade GRADE]
+
+Each puzzle is printed as a '# seed=... grade=...' comment line followed by the grid.
+
+A complete grid is built by a randomized `bitboard.search` of the empty
+board, then clues are removed one at a time in random order. A clue stays
+removed when the puzzle without it still has a single solution, which is
+checked incrementally: the known solution is the only candidate, so it is
+enough to show that no solution exists with the removed box holding any
+other digit. Dead ends found by those checks are shared through a
+cache.LRUCache, since successive puzzles differ by a single clue. With a
+`max_grade`, a clue also stays when removing it would make the puzzle grade
+harder than that, since puzzles stripped to a minimum are nearly all 'expert'.
+
+Every puzzle is generated from its own seed, so the output depends only on
+the seeds and not on the number of worker processes.
+"""
+import argparse
+import collections
+import multiprocessing
+import random
+import sys
+
+import bitboard
+from cache import LRUCache
+from stats import SolverStats
+from topology import diagonal
+
+# Grades from easiest to hardest
+grades = ('easy', 'medium', 'hard', 'expert')
+
+# Strategies tried when grading, cheapest and most human-friendly first
+grading_pipeline = ('pointing', 'box_line', 'naked_pairs', 'hidden_pairs', 'naked_triples',
+                    'hidden_triples', 'x_wing', 'naked_quads', 'hidden_quads')
+
+# Strategies added to naked twins for a 'medium' puzzle; 'hard' ones may use all of grading_pipeline
+medium_pipeline = ('pointing', 'box_line')
+
+Puzzle = collections.namedtuple('Puzzle', 'seed grid solution clues grade nodes')
+
+
+def _shuffler(rng):
+    """A bitboard.search value order that tries candidates in an order drawn from rng."""
+    def order(masks, i, topo):
+        bits = bitboard._bits(masks[i])
+        rng.shuffle(bits)
+        return bits
+    return order
+
+
+def full_grid(rng, topo=None):
+    """
+    Build a random complete grid.
+    Args:
+        rng(random.Random): source of randomness.
+    Returns:
+        The grid as a string.
+    """
+    topo = topo or diagonal
+    masks = bitboard.search(bitboard.grid_masks('.' * len(topo.boxes), topo), topo, order=_shuffler(rng))
+    return bitboard.masks_to_grid(masks, topo)
+
+
+def remove_clues(solution, rng, topo=None, dead=None, max_grade=None):
+    """
+    Remove clues from a complete grid, in random order, while the solution stays unique.
+    Args:
+        solution(string): a complete grid.
+        rng(random.Random): source of randomness.
+        dead(LRUCache): optional cache.LRUCache of dead-end boards shared between checks.
+        max_grade(string): keep every clue whose removal would grade the puzzle harder than this.
+    Returns:
+        A puzzle grid with '.' for the removed boxes, whose only solution is `solution`.
+    """
+    topo = topo or diagonal
+    dead = LRUCache(50000) if dead is None else dead
+    hardest = grades.index(max_grade) if max_grade is not None else len(grades) - 1
+    puzzle = list(solution)
+    order = list(range(len(puzzle)))
+    rng.shuffle(order)
+    for i in order:
+        puzzle[i] = '.'
+        masks = bitboard.grid_masks(puzzle, topo)
+        # Unique exactly when no solution puts another digit in box i
+        masks[i] &= ~topo.digit_mask[solution[i]]
+        if bitboard.count_solutions(masks, 1, topo, dead=dead):
+            puzzle[i] = solution[i]
+        elif hardest < len(grades) - 1 and grades.index(grade(''.join(puzzle), topo)[0]) > hardest:
+            puzzle[i] = solution[i]
+    return ''.join(puzzle)
+
+
+def _singles(masks, topo):
+    """Apply eliminate and only_choice until they stop changing the board. Returns whether it got solved."""
+    bit_count = topo.bit_count
+    while True:
+        before = list(masks)
+        bitboard.only_choice(bitboard.eliminate(masks, topo), topo)
+        if not all(masks):
+            return False
+        if masks == before:
+            return all(bit_count[m] == 1 for m in masks)
+
+
+def grade(grid, topo=None):
+    """
+    Grade a puzzle by the weakest set of strategies that solves it without search.
+
+    'easy' puzzles fall to eliminate and only_choice alone, 'medium' ones also need
+    naked twins, pointing or box/line reduction, and 'hard' ones need larger subsets
+    or X-Wing. 'expert' puzzles cannot be finished without search.
+    Returns:
+        (grade, SolverStats) of a solve with every grading strategy.
+    """
+    topo = topo or diagonal
+    stats = SolverStats()
+    bitboard.solve_grid(grid, topo, stats, grading_pipeline)
+    if stats.nodes > 1:
+        return 'expert', stats
+    if _singles(bitboard.grid_masks(grid, topo), topo):
+        return 'easy', stats
+    masks = bitboard.reduce_puzzle(bitboard.grid_masks(grid, topo), topo, None, medium_pipeline)
+    if masks and all(topo.bit_count[m] == 1 for m in masks):
+        return 'medium', stats
+    return 'hard', stats
+
+
+def generate(seed, topo=None, dead=None, max_grade=None):
+    """
+    Generate one graded puzzle.
+    Args:
+        seed: seed of the puzzle's random.Random, so the same seed gives the same puzzle.
+        dead(LRUCache): optional dead-end cache to share between puzzles.
+        max_grade(string): the hardest grade to let the puzzle reach, see `remove_clues`.
+    Returns:
+        A Puzzle(seed, grid, solution, clues, grade, nodes).
+    """
+    rng = random.Random(seed)
+    solution = full_grid(rng, topo)
+    grid = remove_clues(solution, rng, topo, dead, max_grade)
+    level, stats = grade(grid, topo)
+    return Puzzle(seed, grid, solution, sum(1 for c in grid if c != '.'), level, stats.nodes)
+
+
+def _generate_one(args):
+    seed, max_grade = args
+    return generate(seed, max_grade=max_grade)
+
+
+def generate_many(count, seed=0, workers=None, max_grade=None, chunksize=4):
+    """
+    Generate puzzles in parallel, one per seed from `seed` to `seed + count - 1`.
+    Args:
+        workers(int): number of worker processes. 1 generates in this process.
+        max_grade(string): the hardest grade to let each puzzle reach.
+    Yields:
+        Puzzles in seed order.
+    """
+    seeds = range(seed, seed + count)
+    if workers == 1:
+        dead = LRUCache(50000)
+        for s in seeds:
+            yield generate(s, dead=dead, max_grade=max_grade)
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        for puzzle in pool.imap(_generate_one, [(s, max_grade) for s in seeds], chunksize):
+            yield puzzle
+    finally:
+        pool.terminate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate graded diagonal sudoku puzzles.')
+    parser.add_argument('-n', '--count', type=int, default=10, help='number of puzzles (default: 10)')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the first puzzle (default: 0)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-grade', choices=grades, help='hardest grade to generate (default: expert)')
+    args = parser.parse_args(argv)
+
+    for puzzle in generate_many(args.count, args.seed, args.workers, args.max_grade):
+        # Comment lines keep the output readable by stream.py and benchmark.load_corpus
+        sys.stdout.write('# seed=%d clues=%d grade=%s nodes=%d\n%s\n' % (
+            puzzle.seed, puzzle.clues, puzzle.grade, puzzle.nodes, puzzle.grid))
+
+
+if __name__ == '__main__':
+    main()
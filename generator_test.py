@@ -0,0 +1,51 @@
+import benchmark
+import generator
+import random
+import solution
+import solution_test
+import unittest
+
+from topology import diagonal
+from topology_test import is_valid
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_full_grid(self):
+        grid = generator.full_grid(random.Random(1))
+        self.assertTrue(is_valid(grid, diagonal))
+        self.assertEqual(generator.full_grid(random.Random(1)), grid)
+        self.assertNotEqual(generator.full_grid(random.Random(2)), grid)
+
+    def test_generate_unique(self):
+        puzzle = generator.generate(3, max_grade='medium')
+        self.assertEqual(puzzle, generator.generate(3, max_grade='medium'))
+        self.assertTrue(solution.is_unique(puzzle.grid))
+        self.assertIn(puzzle.grade, ('easy', 'medium'))
+        for clue, solved in zip(puzzle.grid, puzzle.solution):
+            self.assertIn(clue, ('.', solved))
+
+    def test_grade(self):
+        self.assertEqual(generator.grade(solution_test.TestDiagonalSudoku.diagonal_grid)[0], 'easy')
+        # Singles stall on these, but pointing and box/line reduction, or X-Wing and subsets, finish them
+        self.assertEqual(generator.grade('..9174....3....7..7.....12......2......74..18....1..3..5...18..1.4.2...5..3.57...')[0], 'medium')
+        self.assertEqual(generator.grade('........4....74..6.41..6...16.....35..4..371.....4...2.126...57..8...94..7.......')[0], 'hard')
+        self.assertEqual(generator.grade('..9...1.....1..5.......7.2.9.7...6.4...5.9.7...5...2.1....8........4.............')[0], 'expert')
+        solved = ''.join(solution_test.TestDiagonalSudoku.solved_diag_sudoku[box] for box in solution.boxes)
+        self.assertEqual(generator.grade('.' + solved[1:])[0], 'easy')
+
+    def test_grade_singles(self):
+        # Every puzzle of the easy corpus falls to eliminate and only_choice alone,
+        # even where naked twins would also remove candidates along the way
+        grids, topo = benchmark.load_corpus('easy')
+        self.assertEqual(set(generator.grade(grid, topo)[0] for grid in grids), set(['easy']))
+
+    def test_parallel_matches_serial(self):
+        serial = list(generator.generate_many(3, seed=10, workers=1, max_grade='easy'))
+        parallel = list(generator.generate_many(3, seed=10, workers=2, max_grade='easy'))
+        self.assertEqual(serial, parallel)
+        self.assertEqual([p.seed for p in serial], [10, 11, 12])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Packed binary storage for 9x9 puzzles and solutions.
+
+Each board is a fixed 41-byte record holding one 4-bit code per box, 0 for an
+empty box and 1-9 for a digit, two boxes to a byte with the first box in the
+high nibble. A file is a 16-byte header followed by the records:
+
+    offset  size  field
+    0       4     magic b'SDKP'
+    4       1     format version (1)
+    5       1     record size in bytes (41)
+    6       2     reserved, zero
+    8       8     number of records, little-endian
+
+Records have a fixed size, so record i starts at byte 16 + 41 * i and the
+file needs no separate index for random access. PackedReader maps the file
+with mmap and hands out memoryview slices of it, so reading a record copies
+nothing until it is decoded.
+
+Usage:
+    python packed.py pack PUZZLES.txt OUT.sdkp
+    python packed.py unpack IN.sdkp [OUT.txt]
+"""
+import argparse
+import mmap
+import operator
+import os
+import struct
+import sys
+
+import solution
+
+magic = b'SDKP'
+version = 1
+record_size = 41
+header = struct.Struct('<4sBBHQ')
+boxes = solution.boxes
+
+_codes = dict((c, i) for i, c in enumerate('.123456789'))
+_codes['0'] = 0
+# Two grid characters to one byte, and one byte back to two characters
+_encode = dict((a + b, _codes[a] << 4 | _codes[b]) for a in _codes for b in _codes)
+_decode = [('.123456789' + '??????')[b >> 4] + ('.123456789' + '??????')[b & 15] for b in range(256)]
+
+
+def pack(grid):
+    """
+    Pack a grid string into a 41-byte record.
+    Args:
+        grid(string): 81 characters, using '.' or '0' for empty boxes.
+    """
+    if len(grid) != 81:
+        raise ValueError('expected a grid of 81 boxes, got %d' % len(grid))
+    try:
+        return bytes(map(_encode.__getitem__, map(operator.add, grid[0::2], grid[1::2] + '.')))
+    except KeyError as e:
+        raise ValueError('invalid character in grid: %r' % e.args[0])
+
+
+def unpack(record):
+    """Unpack a 41-byte record (bytes or memoryview) into an 81-char grid string."""
+    grid = ''.join(map(_decode.__getitem__, record))[:81]
+    if '?' in grid:
+        raise ValueError('corrupt record: %r' % bytes(record))
+    return grid
+
+
+def pack_values(values):
+    """Pack a values dictionary like `solution.grid_values` returns; unsolved boxes are stored empty."""
+    return pack(''.join(values[box] if len(values[box]) == 1 else '.' for box in boxes))
+
+
+def unpack_values(record):
+    """Unpack a record into a values dictionary, with '123456789' for empty boxes like `solution.grid_values`."""
+    return solution.grid_values(unpack(record))
+
+
+class PackedWriter(object):
+    """
+    Write grids to a packed file.
+
+    Args:
+        path(string): the file to create.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.count = 0
+        self.file.write(header.pack(magic, version, record_size, 0, 0))
+
+    def write(self, grid):
+        """Append a grid string or a values dictionary."""
+        self.file.write(pack_values(grid) if isinstance(grid, dict) else pack(grid))
+        self.count += 1
+
+    def write_many(self, grids):
+        for grid in grids:
+            self.write(grid)
+        return self.count
+
+    def close(self):
+        if self.file.closed:
+            return
+        # The record count is only known at the end, so the header is written twice
+        self.file.seek(0)
+        self.file.write(header.pack(magic, version, record_size, 0, self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PackedReader(object):
+    """
+    Random access to the records of a packed file through mmap.
+
+    Args:
+        path(string): a file written by PackedWriter.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            head = f.read(header.size)
+            if len(head) < header.size or head[:4] != magic:
+                raise ValueError('%s is not a packed puzzle file' % path)
+            _, file_version, size, _, self.count = header.unpack(head)
+            if file_version != version or size != record_size:
+                raise ValueError('%s: unsupported format version %d' % (path, file_version))
+            if os.fstat(f.fileno()).st_size < header.size + self.count * record_size:
+                raise ValueError('%s: truncated, expected %d records' % (path, self.count))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b'')
+
+    def __len__(self):
+        return self.count
+
+    def record(self, i):
+        """Return record i as a zero-copy memoryview. Copy it with bytes() to keep it past `close`."""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('record index out of range')
+        start = header.size + i * record_size
+        return self._view[start:start + record_size]
+
+    def __getitem__(self, i):
+        """Return record i as a grid string."""
+        return unpack(self.record(i))
+
+    def values(self, i):
+        """Return record i as a values dictionary."""
+        return unpack_values(self.record(i))
+
+    def __iter__(self):
+        view, end = self._view, header.size + self.count * record_size
+        for start in range(header.size, end, record_size):
+            yield unpack(view[start:start + record_size])
+
+    def close(self):
+        if self._mmap is not None:
+            self._view.release()
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Records handed out by `record` still point into the map; it closes when they go
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def is_packed(path):
+    """Check whether a file starts with the packed format's magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(magic)) == magic
+
+
+def main(argv=None):
+    import stream
+    parser = argparse.ArgumentParser(description='Convert between text puzzle files and the packed format.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    to_packed = sub.add_parser('pack', help='pack a text file of puzzles')
+    to_packed.add_argument('input', help="text file, one puzzle per line, or '-' for stdin")
+    to_packed.add_argument('output', help='packed file to write')
+    to_text = sub.add_parser('unpack', help='unpack a packed file to text')
+    to_text.add_argument('input', help='packed file')
+    to_text.add_argument('output', nargs='?', default='-', help="text file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        with PackedWriter(args.output) as writer:
+            count = writer.write_many(stream.iter_puzzles(args.input))
+        sys.stderr.write('packed %d puzzles\n' % count)
+    else:
+        out = sys.stdout if args.output == '-' else open(args.output, 'w')
+        try:
+            with PackedReader(args.input) as reader:
+                for grid in reader:
+                    out.write(grid + '\n')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import os
+import packed
+import solution
+import stream
+import tempfile
+import unittest
+
+import batch_test
+import solution_test
+
+
+class TestPacking(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_round_trip(self):
+        record = packed.pack(self.grid)
+        self.assertEqual(len(record), packed.record_size)
+        self.assertEqual(packed.unpack(record), self.grid)
+        self.assertEqual(packed.unpack(packed.pack(self.grid.replace('.', '0'))), self.grid)
+
+    def test_values(self):
+        solved = solution_test.TestDiagonalSudoku.solved_diag_sudoku
+        self.assertEqual(packed.unpack_values(packed.pack_values(solved)), solved)
+        values = solution.grid_values(self.grid)
+        self.assertEqual(packed.unpack_values(packed.pack_values(values)), values)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            packed.pack('x' * 81)
+        with self.assertRaises(ValueError):
+            packed.pack('123')
+        with self.assertRaises(ValueError):
+            packed.unpack(b'\xff' * packed.record_size)
+
+
+class TestPackedFile(unittest.TestCase):
+    grids = batch_test.TestSolveMany.grids
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sdkp')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_random_access(self):
+        with packed.PackedWriter(self.path) as writer:
+            writer.write_many(self.grids)
+            writer.write(solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertEqual(os.path.getsize(self.path), packed.header.size + 11 * packed.record_size)
+        with packed.PackedReader(self.path) as reader:
+            self.assertEqual(len(reader), 11)
+            self.assertEqual(list(reader)[:10], self.grids)
+            self.assertEqual(reader[3], self.grids[3])
+            self.assertEqual(reader.values(-1), solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+            self.assertIsInstance(reader.record(0), memoryview)
+            with self.assertRaises(IndexError):
+                reader[11]
+
+    def test_not_packed(self):
+        with open(self.path, 'w') as f:
+            f.write(self.grids[0] + '\n')
+        self.assertFalse(packed.is_packed(self.path))
+        with self.assertRaises(ValueError):
+            packed.PackedReader(self.path)
+
+    def test_truncated(self):
+        with packed.PackedWriter(self.path) as writer:
+            writer.write_many(self.grids)
+        with open(self.path, 'r+b') as f:
+            f.truncate(packed.header.size + 2 * packed.record_size)
+        with self.assertRaises(ValueError):
+            packed.PackedReader(self.path)
+
+    def test_empty(self):
+        packed.PackedWriter(self.path).close()
+        with packed.PackedReader(self.path) as reader:
+            self.assertEqual(list(reader), [])
+
+    def test_stream(self):
+        with packed.PackedWriter(self.path) as writer:
+            writer.write_many(self.grids)
+        self.assertEqual(list(stream.iter_puzzles(self.path)), self.grids)
+        fd, out_path = tempfile.mkstemp(suffix='.sdkp')
+        os.close(fd)
+        try:
+            with packed.PackedWriter(out_path) as out:
+                self.assertEqual(stream.solve_file(self.path, out, workers=1), (9, 1))
+            with packed.PackedReader(out_path) as reader:
+                expected = [result or '.' * 81 for _, result in batch_test.TestSolveMany().expected()]
+                self.assertEqual(list(reader), expected)
+        finally:
+            os.remove(out_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Parallel search for a single hard puzzle.
+
+Batch solving only helps throughput: one puzzle that needs a large search
+still runs on one core. Here the top of its search tree is expanded breadth
+first, always branching on the box with the fewest candidates as
+`bitboard.search` does, until there are several independent boards for each
+worker. The boards are then searched by a process pool. The first solution
+found terminates the pool, and counting adds up the solutions of every board,
+stopping early once the limit is reached.
+
+With more than one solution, the one returned may differ from the first one
+`bitboard.search` would find, since the boards finish in no particular order.
+
+Usage:
+    python parallel.py [-w WORKERS] [--count] PUZZLE
+"""
+import argparse
+import multiprocessing
+
+import bitboard
+import strategies
+from stats import SolverStats, clock
+from topology import diagonal
+
+# Boards to split a search into per worker, so one slow board does not leave the other workers idle
+parts_per_worker = 4
+
+
+def split(masks, parts, topo=None, stats=None, pipeline=(), order=None):
+    """
+    Expand the top levels of a search until it has at least `parts` boards to search.
+    Args:
+        masks(list): the board, reduced in place.
+        parts(int): the number of boards wanted. A whole level is expanded at a
+            time, so there can be more, and fewer if the search tree is smaller.
+        pipeline(iterable): names of extra strategies, as in `bitboard.search`.
+        order: value ordering, as in `bitboard.search`.
+    Returns:
+        (depth, boards): the level reached and the fully propagated boards on it, in
+        the order `bitboard.search` would visit them. Their solutions together are
+        the solutions of `masks`, and solved boards are among them.
+    """
+    topo = topo or diagonal
+    pipeline = strategies.resolve(pipeline)
+    order = bitboard._value_order(order)
+    bit_count = topo.bit_count
+    masks = bitboard._refine(masks, None, topo, stats, pipeline)
+    if masks is False:
+        return 0, []
+    boards = [masks]
+    depth = 0
+    while len(boards) < parts:
+        expanded = []
+        branched = False
+        for board in boards:
+            unsolved = [(bit_count[m], i) for i, m in enumerate(board) if bit_count[m] > 1]
+            if not unsolved:
+                expanded.append(board)
+                continue
+            branched = True
+            if stats is not None:
+                stats.node(depth)
+            n, i = min(unsolved)
+            for bit in (bitboard._bits(board[i]) if order is None else order(board, i, topo)):
+                branch = list(board)
+                branch[i] = bit
+                if bitboard._refine(branch, (i,), topo, stats, pipeline):
+                    expanded.append(branch)
+                elif stats is not None:
+                    stats.backtrack(depth)
+        if not branched:
+            # Every board is solved: there is nothing left to split
+            break
+        boards = expanded
+        depth += 1
+    return depth, boards
+
+
+def _search_part(args):
+    """Search one board inside a worker. Returns (solved masks or False, SolverStats or None)."""
+    masks, depth, topo, pipeline, order, collect = args
+    stats = SolverStats() if collect else None
+    return bitboard._search(masks, topo, stats, depth, None, strategies.resolve(pipeline),
+                            bitboard._value_order(order)), stats
+
+
+def _count_part(args):
+    """Count the solutions of one board inside a worker. Returns (count, SolverStats or None)."""
+    masks, depth, topo, pipeline, limit, collect = args
+    stats = SolverStats() if collect else None
+    return bitboard._count(masks, limit, topo, stats, depth, None, strategies.resolve(pipeline)), stats
+
+
+def _run(func, tasks, workers, stats, done):
+    """
+    Run tasks on a pool of `workers` processes (or in this process for one worker),
+    merging their stats, until `done(result)` is true for a result or none are left.
+    The pool is terminated on return, which stops any task still running.
+    """
+    if workers == 1 or len(tasks) <= 1:
+        results = map(func, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        results = pool.imap_unordered(func, tasks)
+    try:
+        for result, part_stats in results:
+            if part_stats is not None:
+                stats.merge(part_stats)
+            if done(result):
+                return
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def search(masks, workers=None, topo=None, stats=None, pipeline=(), order=None):
+    """
+    Solve a board with the search spread over a process pool.
+    Args:
+        masks(list): the board, reduced in place.
+        workers(int): number of worker processes, defaults to the CPU count.
+        stats(SolverStats): optional stats.SolverStats, with the counters of every
+            board searched merged in.
+        pipeline(iterable): names of extra strategies, as in `bitboard.search`.
+        order: value ordering by name ('lcv' or 'random'), since it is sent to the workers.
+    Returns:
+        A solved list of masks, or False if no solution exists.
+    """
+    topo = topo or diagonal
+    workers = workers or multiprocessing.cpu_count()
+    pipeline = tuple(pipeline)
+    if stats is not None:
+        start = clock()
+    depth, boards = split(masks, workers * parts_per_worker, topo, stats, pipeline, order)
+    found = []
+
+    def done(result):
+        if result:
+            found.append(result)
+        return bool(found)
+
+    tasks = [(board, depth, topo, pipeline, order, stats is not None) for board in boards]
+    _run(_search_part, tasks, workers, stats, done)
+    result = found[0] if found else False
+    if stats is not None:
+        stats.finish(clock() - start, result)
+    return result
+
+
+def count_solutions(masks, limit=2, workers=None, topo=None, stats=None, pipeline=()):
+    """
+    Count the solutions of a board with the search spread over a process pool.
+    Args:
+        masks(list): the board, reduced in place.
+        limit(int): stop counting at this many solutions, at least 1. None counts them all.
+    Returns:
+        The number of solutions found, at most `limit`.
+    """
+    bitboard._check_limit(limit)
+    topo = topo or diagonal
+    workers = workers or multiprocessing.cpu_count()
+    pipeline = tuple(pipeline)
+    if stats is not None:
+        start = clock()
+    depth, boards = split(masks, workers * parts_per_worker, topo, stats, pipeline)
+    counted = [0]
+
+    def done(count):
+        counted[0] += count
+        return limit is not None and counted[0] >= limit
+
+    # Every board can stop at the limit on its own; the total is capped below
+    tasks = [(board, depth, topo, pipeline, limit, stats is not None) for board in boards]
+    _run(_count_part, tasks, workers, stats, done)
+    count = counted[0] if limit is None else min(counted[0], limit)
+    if stats is not None:
+        stats.finish(clock() - start, count)
+    return count
+
+
+def solve(grid, workers=None, topology=None, stats=None, pipeline=(), order=None):
+    """
+    Find the solution to a Sudoku grid, searching in parallel.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        workers(int): number of worker processes, defaults to the CPU count.
+        topology(Topology): the board layout, defaults to 9x9 diagonal sudoku.
+        stats(SolverStats): optional stats.SolverStats for strategy and search counters.
+        pipeline(iterable): names of strategies.registry strategies, as in `solution.solve`.
+        order: value ordering by name, 'lcv' or 'random'.
+    Returns:
+        The dictionary representation of the final sudoku grid, like `solution.solve`.
+        False if no solution exists.
+    """
+    masks = search(bitboard.grid_masks(grid, topology), workers, topology, stats, pipeline, order)
+    if masks is False:
+        return False
+    return bitboard.masks_to_values(masks, topology)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve one diagonal sudoku with a parallel search.')
+    parser.add_argument('puzzle', help='the puzzle as an 81-char string')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--count', action='store_true', help='count every solution instead of finding one')
+    args = parser.parse_args(argv)
+
+    masks = bitboard.grid_masks(args.puzzle)
+    if args.count:
+        print(count_solutions(masks, None, args.workers))
+        return
+    masks = search(masks, args.workers)
+    print(bitboard.masks_to_grid(masks) if masks else 'unsolvable')
+
+
+if __name__ == '__main__':
+    main()
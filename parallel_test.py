@@ -0,0 +1,55 @@
+import bitboard
+import parallel
+import solution
+import unittest
+
+import solution_test
+from stats import SolverStats
+from topology import get_topology
+from topology_test import is_valid
+
+
+class TestParallel(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+    # A 17-clue puzzle that needs one of the larger bitmask searches of the corpora
+    hard = '.92.........4..56...3...8....9.73.........4..6............9...78..5.............2'
+    standard = get_topology(3, diagonals=False)
+
+    def test_split(self):
+        depth, boards = parallel.split(bitboard.grid_masks(self.hard, self.standard), 8, self.standard)
+        self.assertGreaterEqual(len(boards), 8)
+        self.assertGreater(depth, 0)
+        # The boards divide the search: exactly one of them holds the unique solution
+        counts = [bitboard.count_solutions(list(board), None, self.standard) for board in boards]
+        self.assertEqual(sum(counts), 1)
+        self.assertEqual(parallel.split(bitboard.grid_masks('11' + '.' * 79), 8), (0, []))
+
+    def test_solve(self):
+        expected = bitboard.solve(self.hard, self.standard)
+        for workers in (1, 2):
+            stats = SolverStats()
+            self.assertEqual(parallel.solve(self.hard, workers, self.standard, stats), expected)
+            self.assertEqual((stats.solves, stats.solved), (1, 1))
+            self.assertGreater(stats.nodes, 1)
+        self.assertEqual(parallel.solve(self.grid, 2, pipeline=('pointing',), order='lcv'), solution.solve(self.grid))
+        self.assertIs(parallel.solve('11' + '.' * 79, 2), False)
+
+    def test_other_topologies(self):
+        topo = get_topology(4)
+        grid = bitboard.masks_to_grid(parallel.search(bitboard.grid_masks('.' * 256, topo), 2, topo), topo)
+        self.assertTrue(is_valid(grid, topo))
+
+    def test_count_solutions(self):
+        masks = bitboard.grid_masks(self.hard, self.standard)
+        self.assertEqual(parallel.count_solutions(masks, None, 2, self.standard), 1)
+        grid = solution_test.TestDiagonalSudoku.diagonal_grid
+        self.assertEqual(parallel.count_solutions(bitboard.grid_masks(grid), 2, 2),
+                         bitboard.count_solutions(bitboard.grid_masks(grid), 2))
+        # The empty board has far too many solutions to count: this only returns
+        # because the pool is stopped once the limit is reached
+        self.assertEqual(parallel.count_solutions(bitboard.grid_masks('.' * 81), 5, 2), 5)
+        self.assertEqual(parallel.count_solutions(bitboard.grid_masks('11' + '.' * 79), None, 2), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Opt-in tracing of the changes made to a board during a solve.
+
+Pass a Recorder to `solution.solve(grid, recorder=Recorder())` to keep a
+trace. Each change is stored as a compact (box, old, new) diff rather than a
+full board copy, and `maxlen` turns the trace into a ring buffer that keeps
+only the most recent diffs.
+
+A Trail is the undo log search uses to backtrack on a single board instead
+of copying it for every branch. It takes changes through the same `record`
+call, and forwards them to a Recorder when one is tracing the solve.
+"""
+import collections
+
+
+class Recorder(object):
+    """
+    Records (box, old, new) diffs for one solve.
+
+    Args:
+        maxlen(int): keep at most this many diffs, dropping the oldest first.
+            At least 1; None keeps every diff.
+    """
+
+    def __init__(self, maxlen=None):
+        if maxlen is not None and maxlen < 1:
+            raise ValueError('maxlen must be at least 1 or None to keep every diff, got %r' % (maxlen,))
+        self.maxlen = maxlen
+        # Board state before the oldest diff still held in `diffs`
+        self.base = {}
+        self.diffs = collections.deque()
+
+    def start(self, values):
+        """Reset the trace to begin from the given board."""
+        self.base = dict(values)
+        self.diffs.clear()
+
+    def record(self, box, old, new):
+        """Append a diff, folding the oldest one into `base` once the buffer is full."""
+        if self.maxlen is not None and len(self.diffs) >= self.maxlen:
+            dropped_box, _, dropped_new = self.diffs.popleft()
+            self.base[dropped_box] = dropped_new
+        self.diffs.append((box, old, new))
+
+    def __len__(self):
+        return len(self.diffs)
+
+    def replay(self):
+        """
+        Apply the diffs one at a time to a copy of `base`.
+        Yields:
+            (values, box) after each diff. The same dictionary is updated in place
+            between steps, so copy it if it needs to outlive the iteration.
+        """
+        values = dict(self.base)
+        for box, _, new in self.diffs:
+            values[box] = new
+            yield values, box
+
+    def frames(self):
+        """Return a full board snapshot after each diff, oldest first."""
+        return [dict(values) for values, _ in self.replay()]
+
+
+class Trail(object):
+    """
+    Undo log of the changes made to one board, so search can backtrack in place.
+
+    A Trail is passed wherever a recorder is accepted. It keeps the (box, old)
+    pair of every change, and passes the change on to `recorder` when given,
+    so a search can be traced and undone at the same time.
+    """
+
+    def __init__(self, recorder=None):
+        self.recorder = recorder
+        self.changes = []
+
+    def record(self, box, old, new):
+        self.changes.append((box, old))
+        if self.recorder is not None:
+            self.recorder.record(box, old, new)
+
+    def mark(self):
+        """Return a position to `undo` back to."""
+        return len(self.changes)
+
+    def undo(self, values, mark):
+        """Restore every box changed since `mark`, newest first."""
+        changes = self.changes
+        recorder = self.recorder
+        while len(changes) > mark:
+            box, old = changes.pop()
+            if recorder is not None:
+                recorder.record(box, values[box], old)
+            values[box] = old
+        return values
+
+    def __len__(self):
+        return len(self.changes)
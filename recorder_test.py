@@ -0,0 +1,73 @@
+import solution
+import unittest
+
+from recorder import Recorder, Trail
+import solution_test
+
+
+class TestRecorder(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_off_by_default(self):
+        self.assertFalse(hasattr(solution, 'assignments'))
+
+    def test_frames_rebuild_solution(self):
+        recorder = Recorder()
+        solved = solution.solve(self.grid, recorder=recorder)
+        self.assertEqual(recorder.base, solution.grid_values(self.grid))
+        self.assertEqual(recorder.frames()[-1], solved)
+        for box, old, new in recorder.diffs:
+            self.assertNotEqual(old, new)
+
+    def test_ring_buffer(self):
+        full = Recorder()
+        solution.solve(self.grid, recorder=full)
+        capped = Recorder(maxlen=10)
+        solution.solve(self.grid, recorder=capped)
+        self.assertEqual(len(capped), 10)
+        self.assertEqual(list(capped.diffs), list(full.diffs)[-10:])
+        self.assertEqual(capped.frames(), full.frames()[-10:])
+        smallest = Recorder(maxlen=1)
+        solution.solve(self.grid, recorder=smallest)
+        self.assertEqual(list(smallest.diffs), list(full.diffs)[-1:])
+        for maxlen in (0, -1):
+            with self.assertRaises(ValueError):
+                Recorder(maxlen=maxlen)
+
+    def test_engine_without_recording(self):
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, engine='bitmask', recorder=Recorder())
+
+
+class TestTrail(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_undo(self):
+        values = solution.grid_values(self.grid)
+        before = dict(values)
+        recorder = Recorder()
+        recorder.start(values)
+        trail = Trail(recorder)
+        solution.reduce_puzzle(values, trail)
+        self.assertNotEqual(values, before)
+        self.assertEqual(trail.undo(values, 0), before)
+        self.assertEqual(len(trail), 0)
+        # The recorder saw the changes and their undoing
+        self.assertEqual(recorder.frames()[-1], before)
+
+    def test_search_in_place(self):
+        values = solution.grid_values(self.grid)
+        self.assertIs(solution.search(values), values)
+        self.assertEqual(values, solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_value_orders(self):
+        for order in ('lcv', 'random'):
+            self.assertEqual(solution.solve(self.grid, order=order), solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, order='mcv')
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid, engine='dlx', order='lcv')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,279 @@
+"""
+Incremental pygame renderer for solver traces.
+
+The 10 possible box images (empty, or digits 1-9) are rendered once and
+cached, and a frame only redraws the boxes whose shown digit changed, so
+replaying a recorder.Recorder trace costs one blit per visible change
+instead of 81 freshly rendered squares per frame.
+
+Traces can be played in a window, or exported without a display (SDL's dummy
+video driver) as a PNG sequence or an animated GIF (GIF needs Pillow). GIFs
+are written a frame at a time, each frame holding only the area that changed,
+so memory use does not grow with the length of the trace.
+
+Usage:
+    python renderer.py [-o OUTPUT] [--fps FPS] [PUZZLE]
+
+OUTPUT is 'trace.gif', a pattern such as 'frames/step%04d.png' or a
+directory for a PNG sequence. Without -o the trace plays in a window.
+"""
+import argparse
+import os
+
+import pygame
+
+from objects.SudokuSquare import AAfilledRoundedRect
+
+try:
+    from PIL import GifImagePlugin, Image
+except ImportError:
+    Image = None
+
+here = os.path.dirname(os.path.abspath(__file__))
+background_path = os.path.join(here, 'images', 'sudoku-board-bare.jpg')
+size = (700, 700)
+rows = 'ABCDEFGHI'
+cols = '123456789'
+boxes = [r + c for r in rows for c in cols]
+
+# Same layout as the original PySudoku.play: squares step 57px, with wider gaps between bands
+_tile_size = (45, 40)
+_band_x = (38, 99, 159)
+_band_y = (35, 100, 165)
+_colors = {'': (255, 255, 255), 'digit': (2, 204, 186)}
+
+
+def box_position(box):
+    """Top left pixel of a box's square on the board image."""
+    r, c = rows.index(box[0]), cols.index(box[1])
+    return c * 57 + _band_x[c // 3], r * 57 + _band_y[r // 3]
+
+
+def shown_digit(value):
+    """The digit a box shows for a candidate string: itself when solved, nothing otherwise."""
+    return value if len(value) == 1 and value != '.' else ''
+
+
+class Renderer(object):
+    """
+    Draws boards onto a surface, redrawing only the boxes that changed.
+
+    Args:
+        surface(Surface): where to draw. Defaults to a new off-screen surface.
+    """
+
+    def __init__(self, surface=None):
+        pygame.font.init()
+        self.surface = surface if surface is not None else pygame.Surface(size)
+        background = pygame.image.load(background_path)
+        self.background = background.convert() if pygame.display.get_surface() is not None else background
+        self.font = pygame.font.SysFont('opensans', 21)
+        self.tiles = {}
+        self.rects = dict((box, pygame.Rect(box_position(box), _tile_size)) for box in boxes)
+        self.shown = {}
+        self.reset()
+
+    def tile(self, digit):
+        """Return the cached image of a box showing `digit` ('' for empty)."""
+        tile = self.tiles.get(digit)
+        if tile is None:
+            tile = pygame.Surface(_tile_size, pygame.SRCALPHA)
+            AAfilledRoundedRect(tile, (0, 0) + _tile_size, _colors['digit' if digit else ''])
+            if digit:
+                tile.blit(self.font.render(digit, 1, (255, 255, 255)), (17, 4))
+            self.tiles[digit] = tile
+        return tile
+
+    def reset(self):
+        """Draw an empty board. Returns the dirty rectangle."""
+        self.surface.blit(self.background, (0, 0))
+        self.shown = dict.fromkeys(boxes, None)
+        for box in boxes:
+            self.set(box, '')
+        return self.surface.get_rect()
+
+    def set(self, box, digit):
+        """
+        Show `digit` in a box.
+        Returns:
+            The rectangle redrawn, or None when the box already showed it.
+        """
+        if self.shown[box] == digit:
+            return None
+        self.shown[box] = digit
+        rect = self.rects[box]
+        # The tile has rounded, transparent corners, so restore the board under it first
+        self.surface.blit(self.background, rect, rect)
+        self.surface.blit(self.tile(digit), rect)
+        return rect
+
+    def draw(self, values):
+        """
+        Show a whole board.
+        Args:
+            values: a values dictionary or a grid string.
+        Returns:
+            The list of rectangles redrawn.
+        """
+        if isinstance(values, str):
+            values = dict(zip(boxes, values))
+        rects = [self.set(box, shown_digit(values[box])) for box in boxes]
+        return [rect for rect in rects if rect is not None]
+
+
+def iter_changes(trace):
+    """
+    Turn a trace into frames of visible changes.
+    Args:
+        trace: a recorder.Recorder, or a list of values dictionaries (one per step).
+    Yields:
+        For every frame, a list of (box, digit) changes from the frame before. The
+        first frame lists every box.
+    """
+    if hasattr(trace, 'replay'):
+        shown = dict((box, shown_digit(trace.base[box])) for box in boxes)
+        yield list(shown.items())
+        for values, box in trace.replay():
+            digit = shown_digit(values[box])
+            if shown[box] != digit:
+                shown[box] = digit
+                yield [(box, digit)]
+        return
+    shown = None
+    for values in trace:
+        current = dict((box, shown_digit(values[box])) for box in boxes)
+        if shown is None:
+            yield list(current.items())
+        else:
+            changes = [(box, digit) for box, digit in current.items() if shown[box] != digit]
+            if changes:
+                yield changes
+        shown = current
+
+
+def _frames(trace, renderer):
+    """Apply each frame of a trace to the renderer, yielding the rectangles redrawn."""
+    for changes in iter_changes(trace):
+        rects = [renderer.set(box, digit) for box, digit in changes]
+        yield [rect for rect in rects if rect is not None]
+
+
+def export(trace, path, fps=5):
+    """
+    Render a trace without a display and save it.
+    Args:
+        trace: a recorder.Recorder, or a list of values dictionaries.
+        path(string): a '.gif' file, a PNG file name pattern with a '%d' style
+            field, or a directory to fill with frame00000.png, frame00001.png, ...
+        fps(float): frames per second of the GIF.
+    Returns:
+        The number of frames written.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    renderer = Renderer()
+    count = 0
+    if path.lower().endswith('.gif'):
+        if Image is None:
+            raise ImportError('GIF export needs Pillow: pip install pillow')
+        return _write_gif(_frames(trace, renderer), renderer, path, int(round(1000.0 / fps)))
+    if '%' not in path:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        path = os.path.join(path, 'frame%05d.png')
+    for _ in _frames(trace, renderer):
+        pygame.image.save(renderer.surface, path % count)
+        count += 1
+    return count
+
+
+def _palette(renderer):
+    """A palette image for the GIF, made from the board and every box image so later frames map onto it."""
+    tiles = [renderer.tile(digit) for digit in [''] + list('123456789')]
+    sheet = pygame.Surface((size[0] + _tile_size[0], size[1]))
+    sheet.blit(renderer.surface, (0, 0))
+    for n, tile in enumerate(tiles):
+        sheet.blit(renderer.background, (size[0], n * _tile_size[1]), pygame.Rect((0, 0), _tile_size))
+        sheet.blit(tile, (size[0], n * _tile_size[1]))
+    image = Image.frombytes('RGB', sheet.get_size(), pygame.image.tobytes(sheet, 'RGB'))
+    return image.quantize(256, dither=Image.Dither.NONE)
+
+
+def _write_gif(frames, renderer, path, duration):
+    """
+    Write frames to an animated GIF as they are rendered.
+    Args:
+        frames: iterator of dirty rectangle lists, as from `_frames`, drawing on `renderer.surface`.
+        duration(int): milliseconds per frame.
+    Returns:
+        The number of frames written.
+    """
+    count = 0
+    palette = None
+    with open(path, 'wb') as f:
+        for rects in frames:
+            if palette is None:
+                # The first frame is the whole board, and sets the palette of every frame after it
+                palette = _palette(renderer)
+                rect = renderer.surface.get_rect()
+            elif rects:
+                rect = rects[0].unionall(rects[1:])
+            else:
+                rect = pygame.Rect(0, 0, 1, 1)
+            area = Image.frombytes('RGB', rect.size, pygame.image.tobytes(renderer.surface.subsurface(rect), 'RGB'))
+            area = area.quantize(palette=palette, dither=Image.Dither.NONE)
+            if count == 0:
+                header, _ = GifImagePlugin.getheader(area, info={'loop': 0, 'duration': duration})
+                f.write(b''.join(header))
+            f.write(b''.join(GifImagePlugin.getdata(area, offset=rect.topleft, duration=duration)))
+            count += 1
+        if count:
+            f.write(b';')
+    if not count:
+        os.remove(path)
+    return count
+
+
+def play(trace, fps=5, wait=True):
+    """
+    Play a trace in a window.
+    Args:
+        trace: a recorder.Recorder, or a list of values dictionaries.
+        fps(float): frames per second.
+        wait(bool): keep the window open until it is closed.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    renderer = Renderer(screen)
+    pygame.display.flip()
+    clock = pygame.time.Clock()
+    for rects in _frames(trace, renderer):
+        pygame.event.pump()
+        pygame.display.update(rects)
+        clock.tick(fps)
+    # leave game showing until closed by user
+    while wait:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                wait = False
+    pygame.quit()
+
+
+def main(argv=None):
+    import solution
+    from recorder import Recorder
+    parser = argparse.ArgumentParser(description='Render the trace of a diagonal sudoku solve.')
+    parser.add_argument('puzzle', nargs='?', default='2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3')
+    parser.add_argument('-o', '--output', help='GIF file, PNG file pattern or directory (default: play in a window)')
+    parser.add_argument('--fps', type=float, default=5, help='frames per second (default: 5)')
+    args = parser.parse_args(argv)
+
+    recorder = Recorder()
+    solution.solve(args.puzzle, recorder=recorder)
+    if args.output:
+        print('%d frames written' % export(recorder, args.output, args.fps))
+    else:
+        play(recorder, args.fps)
+
+
+if __name__ == '__main__':
+    main()
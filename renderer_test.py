@@ -0,0 +1,101 @@
+import os
+import resource
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+try:
+    import renderer
+except ImportError:
+    renderer = None
+
+import solution
+import solution_test
+from recorder import Recorder
+
+
+@unittest.skipUnless(renderer, 'pygame is not installed')
+class TestRenderer(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def setUp(self):
+        self.recorder = Recorder()
+        self.solved = solution.solve(self.grid, recorder=self.recorder)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_redraws_only_changes(self):
+        r = renderer.Renderer()
+        self.assertEqual(len(r.draw(self.grid)), sum(1 for c in self.grid if c != '.'))
+        self.assertEqual(r.draw(self.grid), [])
+        self.assertEqual(r.draw(self.solved), [r.rects[box] for box in solution.boxes if self.grid[solution.boxes.index(box)] == '.'])
+        self.assertEqual(sorted(r.tiles), [''] + list('123456789'))
+
+    def test_changes_match_frames(self):
+        changes = list(renderer.iter_changes(self.recorder))
+        legacy = list(renderer.iter_changes(self.recorder.frames()))
+        self.assertEqual(len(changes[0]), 81)
+        self.assertTrue(all(len(frame) == 1 for frame in changes[1:]))
+        # The trace replays to the solution either way
+        for frames in (changes, legacy):
+            shown = {}
+            for frame in frames:
+                shown.update(frame)
+            self.assertEqual(shown, self.solved)
+
+    def test_same_image_as_full_redraw(self):
+        r = renderer.Renderer()
+        for _ in renderer._frames(self.recorder, r):
+            pass
+        fresh = renderer.Renderer()
+        fresh.draw(self.solved)
+        self.assertEqual(renderer.pygame.image.tobytes(r.surface, 'RGB'),
+                         renderer.pygame.image.tobytes(fresh.surface, 'RGB'))
+
+    def test_export_png(self):
+        frames = self.recorder.frames()[-5:]
+        count = renderer.export(frames, os.path.join(self.dir, 'frames'))
+        self.assertEqual(count, len(list(renderer.iter_changes(frames))))
+        self.assertEqual(len(os.listdir(os.path.join(self.dir, 'frames'))), count)
+        renderer.export(self.recorder.frames()[:3], os.path.join(self.dir, 'step%d.png'))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'step0.png')))
+
+    @unittest.skipUnless(renderer and renderer.Image, 'Pillow is not installed')
+    def test_export_gif(self):
+        path = os.path.join(self.dir, 'trace.gif')
+        count = renderer.export(self.recorder.frames()[-5:], path, fps=20)
+        image = renderer.Image.open(path)
+        self.assertEqual(image.n_frames, count)
+        self.assertEqual(image.info['duration'], 50)
+        image.seek(count - 1)
+        # The last frame, drawn over the earlier ones, shows every box of the solved board
+        last = image.convert('RGB')
+        image.close()
+        fresh = renderer.Renderer()
+        fresh.draw(self.recorder.frames()[-1])
+        expected = renderer.Image.frombytes('RGB', renderer.size, renderer.pygame.image.tobytes(fresh.surface, 'RGB'))
+        for rect in fresh.rects.values():
+            box = tuple(rect.topleft) + tuple(rect.bottomright)
+            a, b = last.crop(box).tobytes(), expected.crop(box).tobytes()
+            # Up to the colours lost to the 256-colour palette
+            self.assertLess(sum(abs(x - y) for x, y in zip(a, b)) / float(len(a)), 5)
+
+    @unittest.skipUnless(renderer and renderer.Image, 'Pillow is not installed')
+    def test_export_long_gif(self):
+        # 4000 frames, each flipping one box: kept as full frames they would need gigabytes
+        values = solution.grid_values(self.grid)
+        flipped = dict(values, B2='5')
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        count = renderer.export([values, flipped] * 2000, os.path.join(self.dir, 'long.gif'), fps=50)
+        grown_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        self.assertEqual(count, 4000)
+        self.assertLess(grown_kb, 100 * 1024)
+        self.assertLess(os.path.getsize(os.path.join(self.dir, 'long.gif')), 4000 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,428 @@
+"""
+Asyncio front end to the solver, batching concurrent requests onto a process pool.
+
+    async with AsyncSolver(workers=4) as solver:
+        values = await solver.solve(grid, timeout=0.5)
+
+Requests wait in a queue for up to `max_delay` seconds so concurrent ones can
+be sent to a worker together, in batches of at most `max_batch` puzzles. A
+request with a timeout carries a deadline into the worker, and every search
+is also limited to `max_time` seconds, so one runaway puzzle cannot hold up
+the rest of its batch for long. Every request also has a cancellation flag
+in memory shared with the workers. The search checks its deadline and flag
+at every node and gives up once either trips. Cancelling a request that has
+not been dispatched yet drops it from its batch, and cancelling one that is
+already running stops its search at the next node. Closing the solver
+cancels everything, so no worker is left searching.
+
+Usage:
+    python service.py [-w WORKERS] [-e ENGINE] [-t TIMEOUT] [--max-time SECONDS] [--port PORT]
+
+Without --port, puzzles are read one per line from stdin. With --port, a TCP
+server answers every line it receives. Replies are the solved 81-char
+string, 'unsolvable', 'timeout' or 'error: <reason>'.
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import batch
+import solution
+from stats import SolverStats
+from stream import parse_line
+
+engines = ('bitmask', 'dlx', 'strings')
+
+# Cancellation flags shared with the workers, one byte per request slot, set by _init_worker
+_cancelled = None
+
+
+class _Cancelled(Exception):
+    """Raised inside a worker's search when its request has been cancelled."""
+
+
+def _init_worker(engine, topology, cancelled):
+    """Pool initializer: pick the engine and topology and keep the cancellation flags."""
+    global _cancelled
+    batch._init_worker(engine, topology)
+    _cancelled = cancelled
+
+
+def _limits_hook(deadline, slot):
+    """
+    A SolverStats hook that aborts the search once the wall clock passes `deadline`,
+    or once the cancellation flag of `slot` is set.
+    """
+    def hook(event, depth):
+        if event != 'node':
+            return
+        if slot is not None and _cancelled[slot]:
+            raise _Cancelled()
+        if deadline is not None and time.time() > deadline:
+            raise TimeoutError('search ran past its deadline')
+    return hook
+
+
+def _solve_batch(grids, deadlines, slots=None, max_time=None):
+    """
+    Solve a batch inside a worker process.
+    Args:
+        grids(list): grid strings.
+        deadlines(list): a time.time() deadline or None for every grid.
+        slots(list): the cancellation flag slot of every grid, or None for grids that have none.
+        max_time(float): seconds any one grid may be searched for, or None for no limit.
+    Returns:
+        The solved grid string, False, None for a timeout or cancellation, or a
+        ValueError for a bad grid, per grid.
+    """
+    results = []
+    for grid, deadline, slot in zip(grids, deadlines, slots or [None] * len(grids)):
+        if max_time is not None:
+            deadline = min(deadline or float('inf'), time.time() + max_time)
+        if (deadline is not None and time.time() > deadline) or (slot is not None and _cancelled[slot]):
+            results.append(None)
+            continue
+        stats = None
+        if deadline is not None or slot is not None:
+            stats = SolverStats(_limits_hook(deadline, slot))
+        try:
+            results.append(batch.solve_grid(grid, batch._engine, batch._topology, stats))
+        except (TimeoutError, _Cancelled):
+            results.append(None)
+        except ValueError as e:
+            results.append(e)
+    return results
+
+
+class AsyncSolver(object):
+    """
+    Solve puzzles from asyncio code without blocking the event loop.
+
+    Args:
+        workers(int): number of worker processes. Defaults to the number of CPUs.
+        engine(string): 'bitmask', 'dlx' or 'strings'.
+        topology(Topology): board layout, defaults to 9x9 diagonal sudoku.
+        max_batch(int): the most puzzles sent to a worker at once.
+        max_delay(float): seconds to wait for more requests before sending a partial batch.
+        timeout(float): default per-request timeout in seconds. None waits forever.
+        max_time(float): seconds a worker may search any one puzzle for, even when its
+            caller waits forever; the request then fails with TimeoutError. None disables it.
+        slots(int): cancellation flags shared with the workers. Requests beyond this many
+            in flight cannot be stopped once dispatched, only by their deadline.
+    """
+
+    def __init__(self, workers=None, engine='bitmask', topology=None, max_batch=32, max_delay=0.002, timeout=None,
+                 max_time=60.0, slots=4096):
+        if engine not in engines:
+            raise ValueError('Unknown engine: %r, expected one of %s' % (engine, ', '.join(engines)))
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.topology = topology
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_time = max_time
+        self._flags = multiprocessing.RawArray('b', slots)
+        self._free = []
+        self._executor = None
+        self._queue = None
+        self._batcher = None
+        self._slots = None
+        self._tasks = set()
+        self.in_flight = 0
+        self.batches = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.latencies = collections.deque(maxlen=1000)
+
+    def start(self):
+        """Start the worker pool and the batching task. Called on first use."""
+        if self._batcher is None:
+            # A closed solver set every flag; start again with all of them clear
+            self._flags[:] = bytes(len(self._flags))
+            self._free = list(range(len(self._flags) - 1, -1, -1))
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self.engine, self.topology, self._flags))
+            self._queue = asyncio.Queue()
+            # At most two batches per worker are queued in the pool, the rest wait here
+            self._slots = asyncio.Semaphore(2 * self.workers)
+            self._batcher = asyncio.ensure_future(self._collect())
+        return self
+
+    async def solve_grid(self, grid, timeout=None):
+        """
+        Solve a grid.
+        Args:
+            grid(string): a string representing a sudoku grid.
+            timeout(float): seconds to wait, overriding the solver's default.
+        Returns:
+            The solved grid string. False if no solution exists.
+        Raises:
+            TimeoutError: when the timeout passes first.
+        """
+        self.start()
+        timeout = self.timeout if timeout is None else timeout
+        future = asyncio.get_running_loop().create_future()
+        deadline = None if timeout is None else time.time() + timeout
+        slot = self._free.pop() if self._free else None
+        self._queue.put_nowait((grid, deadline, future, time.perf_counter(), slot))
+        try:
+            if timeout is None:
+                return await future
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._cancel(slot)
+            raise TimeoutError('no solution within %s seconds' % timeout)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            self._cancel(slot)
+            raise
+
+    def _cancel(self, slot):
+        """Tell the worker searching a request's grid to stop."""
+        if slot is not None:
+            self._flags[slot] = 1
+
+    def _release(self, batch_):
+        """Return the cancellation slots of finished requests to the free list."""
+        for item in batch_:
+            slot = item[4]
+            if slot is not None:
+                self._flags[slot] = 0
+                self._free.append(slot)
+
+    async def solve(self, grid, timeout=None):
+        """
+        Solve a grid.
+        Returns:
+            The dictionary representation of the final sudoku grid, like `solution.solve`.
+            False if no solution exists.
+        """
+        result = await self.solve_grid(grid, timeout)
+        if result is False:
+            return False
+        boxes = self.topology.boxes if self.topology else solution.boxes
+        return dict(zip(boxes, result))
+
+    async def _collect(self):
+        """Group queued requests into batches and hand them to the pool."""
+        while True:
+            batch_ = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_delay)
+            while len(batch_) < self.max_batch and not self._queue.empty():
+                batch_.append(self._queue.get_nowait())
+            # Requests cancelled or timed out while queued are dropped here
+            self._release([item for item in batch_ if item[2].done()])
+            batch_ = [item for item in batch_ if not item[2].done()]
+            if batch_:
+                await self._slots.acquire()
+                task = asyncio.ensure_future(self._dispatch(batch_))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch_):
+        """Solve one batch in the pool and resolve the futures of its requests."""
+        loop = asyncio.get_running_loop()
+        self.in_flight += len(batch_)
+        self.batches += 1
+        try:
+            results = await loop.run_in_executor(
+                self._executor, _solve_batch, [item[0] for item in batch_], [item[1] for item in batch_],
+                [item[4] for item in batch_], self.max_time)
+        except asyncio.CancelledError:
+            # The solver is closing: nobody will resolve these requests any more
+            for item in batch_:
+                item[2].cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch_)
+        finally:
+            self.in_flight -= len(batch_)
+            self._slots.release()
+        self._release(batch_)
+        now = time.perf_counter()
+        for (grid, deadline, future, submitted, slot), result in zip(batch_, results):
+            if future.done():
+                continue
+            if result is None:
+                future.set_exception(asyncio.TimeoutError())
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                self.completed += 1
+                self.latencies.append(now - submitted)
+                future.set_result(result)
+
+    def metrics(self):
+        """
+        Return the current counters.
+        Returns:
+            A dictionary with the queue depth, requests in flight, totals and
+            p50/p99 latency in milliseconds over the last 1000 solved requests.
+        """
+        latencies = sorted(self.latencies)
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))] * 1000
+
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'in_flight': self.in_flight,
+            'batches': self.batches,
+            'completed': self.completed,
+            'timeouts': self.timeouts,
+            'cancelled': self.cancelled,
+            'p50_ms': percentile(0.5),
+            'p99_ms': percentile(0.99),
+        }
+
+    async def close(self):
+        """Stop batching, fail the requests still queued, stop every search and shut the pool down."""
+        if self._batcher is None:
+            return
+        # Searches still running stop at their next node, so the workers can exit
+        self._flags[:] = b'\x01' * len(self._flags)
+        self._batcher.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        while not self._queue.empty():
+            future = self._queue.get_nowait()[2]
+            if not future.done():
+                future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._batcher = None
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def reply(solver, grid, timeout=None):
+    """Solve a grid and format the answer as a line of the stdin/TCP protocol."""
+    try:
+        result = await solver.solve_grid(grid, timeout)
+    except TimeoutError:
+        return 'timeout'
+    except ValueError as e:
+        return 'error: %s' % e
+    return result or 'unsolvable'
+
+
+async def _answer_lines(solver, lines, write, timeout):
+    """Answer (lineno, line) pairs from an async iterator, writing replies in input order."""
+    replies = asyncio.Queue()
+
+    async def respond():
+        while True:
+            task = await replies.get()
+            if task is None:
+                return
+            await write(await task)
+
+    responder = asyncio.ensure_future(respond())
+    async for lineno, line in lines:
+        try:
+            grid = parse_line(line, lineno)
+        except ValueError as e:
+            grid = e
+        if grid is None:
+            continue
+        if isinstance(grid, ValueError):
+            task = asyncio.get_running_loop().create_future()
+            task.set_result('error: %s' % grid)
+        else:
+            task = asyncio.ensure_future(reply(solver, grid, timeout))
+        replies.put_nowait(task)
+    replies.put_nowait(None)
+    await responder
+
+
+async def serve_tcp(solver, host='127.0.0.1', port=8765, timeout=None):
+    """Start a TCP server answering one puzzle per line. Returns the asyncio server."""
+    async def handle(reader, writer):
+        async def lines():
+            lineno = 0
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                lineno += 1
+                yield lineno, line.decode('ascii', 'replace')
+
+        async def write(text):
+            writer.write((text + '\n').encode('ascii'))
+            await writer.drain()
+
+        try:
+            await _answer_lines(solver, lines(), write, timeout)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def serve_stdin(solver, timeout=None, stdin=sys.stdin, out=sys.stdout):
+    """Answer the puzzles on stdin, one reply line per puzzle."""
+    loop = asyncio.get_running_loop()
+
+    async def lines():
+        lineno = 0
+        while True:
+            line = await loop.run_in_executor(None, stdin.readline)
+            if not line:
+                return
+            lineno += 1
+            yield lineno, line
+
+    async def write(text):
+        out.write(text + '\n')
+        out.flush()
+
+    await _answer_lines(solver, lines(), write, timeout)
+
+
+async def _main(args):
+    async with AsyncSolver(args.workers, args.engine, max_batch=args.batch, timeout=args.timeout,
+                           max_time=args.max_time) as solver:
+        if args.port is None:
+            await serve_stdin(solver)
+        else:
+            server = await serve_tcp(solver, args.host, args.port)
+            sys.stderr.write('listening on %s:%d\n' % (args.host, args.port))
+            async with server:
+                await server.serve_forever()
+        sys.stderr.write(json.dumps(solver.metrics(), sort_keys=True) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the sudoku solver over stdin or TCP.')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('-e', '--engine', default='bitmask', choices=engines, help='solver engine (default: bitmask)')
+    parser.add_argument('-b', '--batch', type=int, default=32, help='most puzzles per batch (default: 32)')
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='per-puzzle timeout in seconds')
+    parser.add_argument('--max-time', type=float, default=60.0,
+                        help='seconds a worker may search any one puzzle, even without a timeout (default: 60)')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on with --port')
+    parser.add_argument('--port', type=int, default=None, help='serve TCP on this port instead of reading stdin')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
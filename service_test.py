@@ -0,0 +1,161 @@
+import asyncio
+import batch
+import benchmark
+import io
+import service
+import solution
+import solution_test
+import time
+import unittest
+
+import batch_test
+from topology import get_topology
+
+# Has no solution, which the bitmask engine takes minutes to prove without the diagonal units
+impossible = '.....5.8....6.1.43..........1.5........1.6...3.......553.....61........4.........'
+standard = get_topology(3, diagonals=False)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncSolver(unittest.TestCase):
+    grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+    def test_solve(self):
+        async def go():
+            async with service.AsyncSolver(workers=1) as solver:
+                values = await solver.solve(self.grid)
+                grids = await asyncio.gather(*[solver.solve_grid(g) for g in batch_test.TestSolveMany.grids])
+                return values, grids, solver.metrics()
+
+        values, grids, metrics = run(go())
+        self.assertEqual(values, solution_test.TestDiagonalSudoku.solved_diag_sudoku)
+        self.assertEqual(list(enumerate(grids)), batch_test.TestSolveMany().expected())
+        self.assertEqual(metrics['completed'], 11)
+        # The concurrent requests shared batches
+        self.assertLess(metrics['batches'], 11)
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertIsNotNone(metrics['p99_ms'])
+
+    def test_timeout(self):
+        async def go():
+            async with service.AsyncSolver(workers=1, max_delay=0.05) as solver:
+                with self.assertRaises(TimeoutError):
+                    await solver.solve(self.grid, timeout=0.001)
+                return solver.metrics()
+
+        self.assertEqual(run(go())['timeouts'], 1)
+
+    def test_deadline_aborts_search(self):
+        self.assertEqual(service._solve_batch([self.grid], [0.0]), [None])
+        # The dictionary engine needs dozens of search nodes and far longer than a millisecond here
+        slow = '..9...1.....1..5.......7.2.9.7...6.4...5.9.7...5...2.1....8........4.............'
+        batch._init_worker('strings', None)
+        try:
+            results = service._solve_batch([slow, slow], [time.time() + 0.001, None])
+        finally:
+            batch._init_worker('bitmask', None)
+        self.assertIsNone(results[0])
+        self.assertTrue(results[1])
+
+    def test_cancel(self):
+        async def go():
+            async with service.AsyncSolver(workers=1, max_delay=0.05) as solver:
+                task = asyncio.ensure_future(solver.solve(self.grid))
+                await asyncio.sleep(0)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                # The solver keeps serving other requests
+                self.assertTrue(await solver.solve(self.grid))
+                return solver.metrics()
+
+        metrics = run(go())
+        self.assertEqual((metrics['cancelled'], metrics['completed']), (1, 1))
+
+    def test_cancel_running_search(self):
+        easy = benchmark.load_corpus('easy')[0][0]
+
+        async def go():
+            async with service.AsyncSolver(workers=1, topology=standard, max_delay=0.05) as solver:
+                hard = asyncio.ensure_future(solver.solve_grid(impossible))
+                other = asyncio.ensure_future(solver.solve_grid(easy))
+                # Both share a batch, and the impossible puzzle is searched first
+                await asyncio.sleep(0.3)
+                self.assertEqual(solver.metrics()['in_flight'], 2)
+                hard.cancel()
+                answer = await asyncio.wait_for(other, 10)
+                return answer, solver.metrics()
+
+        answer, metrics = run(go())
+        self.assertEqual(answer, batch.solve_grid(easy, topology=standard))
+        self.assertEqual((metrics['cancelled'], metrics['completed']), (1, 1))
+
+    def test_max_time(self):
+        async def go():
+            async with service.AsyncSolver(workers=1, topology=standard, max_time=0.2) as solver:
+                with self.assertRaises(TimeoutError):
+                    await asyncio.wait_for(solver.solve_grid(impossible), 10)
+
+        run(go())
+
+    def test_close_stops_searches(self):
+        async def go():
+            solver = service.AsyncSolver(workers=1, topology=standard).start()
+            task = asyncio.ensure_future(solver.solve_grid(impossible))
+            await asyncio.sleep(0.3)
+            processes = list(solver._executor._processes.values())
+            await solver.close()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return processes
+
+        for process in run(go()):
+            process.join(10)
+            self.assertFalse(process.is_alive())
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            service.AsyncSolver(engine='numpy')
+
+
+class TestFrontEnd(unittest.TestCase):
+
+    def test_stdin(self):
+        grid = solution_test.TestDiagonalSudoku.diagonal_grid
+        stdin = io.StringIO('\n'.join([grid, '# comment', '123', '11' + '.' * 79]) + '\n')
+        out = io.StringIO()
+
+        async def go():
+            async with service.AsyncSolver(workers=1) as solver:
+                await service.serve_stdin(solver, stdin=stdin, out=out)
+
+        run(go())
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], ''.join(solution.solve(grid)[box] for box in solution.boxes))
+        self.assertTrue(lines[1].startswith('error:'))
+        self.assertEqual(lines[2], 'unsolvable')
+
+    def test_tcp(self):
+        grid = solution_test.TestDiagonalSudoku.diagonal_grid
+
+        async def go():
+            async with service.AsyncSolver(workers=1) as solver:
+                server = await service.serve_tcp(solver, port=0)
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write((grid + '\n').encode('ascii'))
+                writer.write_eof()
+                answer = await reader.readline()
+                writer.close()
+                server.close()
+                await server.wait_closed()
+                return answer.decode('ascii').strip()
+
+        self.assertEqual(run(go()), ''.join(solution.solve(grid)[box] for box in solution.boxes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,70 +1,55 @@
-import itertools
+from recorder import Trail
+from stats import clock
 
-assignments = []
 rows = 'ABCDEFGHI'
 cols = '123456789'
 
-def assign_value(values, box, value):
+def assign_value(values, box, value, recorder=None):
     """
     Please use this function to update your values dictionary!
-    Assigns a value to a given box. If it updates the board record it.
+    Assigns a value to a given box. If it updates the board and a recorder is given, record the change.
     """
 
-    # Don't waste memory appending actions that don't actually change any values
+    # Don't waste memory recording actions that don't actually change any values
     if values[box] == value:
         return values
 
+    if recorder is not None:
+        recorder.record(box, values[box], value)
     values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
     return values
 
-def naked_twins(values):
+def naked_twins(values, recorder=None):
     """Eliminate values using the naked twins strategy.
+
+    Twins are looked for in each unit on the current board and eliminated from
+    that unit straight away, so a pair found earlier never outlives the boxes
+    that formed it.
     Args:
         values(dict): a dictionary of the form {'box_name': '123456789', ...}
+        recorder(Recorder): optional trace of the changes made
     Returns:
         values(dict): the values dictionary with the naked twins eliminated from peers.
     """
-    # Find all instances of naked twins
-    naked_twin_dict = {}
-
-    no_more_twins = False
-
-    while not no_more_twins:
-        board_before = values
-        for unit in unitlist:
-            # Build a dictionary/hash map to identify a naked twin pair
-            vdict = {}
-            for box in unit:
-                # Identify box containing only 2 digits as a candidate for a naked twin
-                if len(values[box]) == 2:
-                    if not values[box] in vdict:
-                        vdict[values[box]] = [box]
-                    else:
-                        vdict[values[box]].append(box)
-            # Examine the dictionary to validate the candidates present as naked twin pairs
-            for key in vdict:
-                # Require 2 boxes for naked twin pair
-                if len(vdict[key]) == 2:
-                    if not key in naked_twin_dict:
-                        naked_twin_dict[key] = [unit]
-                    else:
-                        naked_twin_dict[key].append(unit)
-
-        # Eliminate the naked twins as possibilities for their peers
-        for key in naked_twin_dict:
-            for unit in naked_twin_dict[key]:
-                for box in unit:
-                    if values[box] != key:
-                        assign_value(values, box, values[box].replace(key[0], ''))
-                        assign_value(values, box, values[box].replace(key[1], ''))
-
-        board_after = values
-        # if boards before and after naked twin detection are the same then there are no more twins thus we end the while loop
-        if board_before == board_after:
-            no_more_twins = True
-        return values
+    for unit in unitlist:
+        # First box seen in this unit for every two-digit value
+        seen = {}
+        for box in unit:
+            pair = values[box]
+            if len(pair) != 2:
+                continue
+            twin = seen.get(pair)
+            # The earlier box may have lost a digit to another pair since it was seen
+            if twin is None or values[twin] != pair:
+                seen[pair] = box
+                continue
+            # Eliminate the naked twins as possibilities for the other boxes of the unit
+            for peer in unit:
+                if peer == box or peer == twin:
+                    continue
+                if pair[0] in values[peer] or pair[1] in values[peer]:
+                    assign_value(values, peer, values[peer].replace(pair[0], '').replace(pair[1], ''), recorder)
+    return values
 
 def cross(A, B):
     "Cross product of elements in A and elements in B."
@@ -100,36 +85,57 @@ def display(values):
         if r in 'CF': print(line)
     return
 
-def eliminate(values):
+def eliminate(values, recorder=None):
     solved_values = [box for box in values.keys() if len(values[box]) == 1]
-    solved_values_not = [box for box in values.keys() if len(values[box]) != 1]
     for box in solved_values:
         digit = values[box]
         for peer in peers[box]:
-            values[peer] = values[peer].replace(digit,'')
+            if digit not in values[peer]:
+                continue
+            if recorder is None:
+                values[peer] = values[peer].replace(digit,'')
+            else:
+                assign_value(values, peer, values[peer].replace(digit,''), recorder)
     return values
 
-def only_choice(values):
+def only_choice(values, recorder=None):
     for unit in unitlist:
         for digit in '123456789':
             dplaces = [box for box in unit if digit in values[box]]
             if len(dplaces) == 1:
-                assign_value(values, dplaces[0], digit)
-                #values[dplaces[0]] = digit
+                assign_value(values, dplaces[0], digit, recorder)
     return values
 
-def reduce_puzzle(values):
+def _apply(strategy, values, recorder, stats):
+    """Run one strategy, adding its time and removed candidates to stats when given."""
+    if stats is None:
+        return strategy(values, recorder)
+    before = sum(len(v) for v in values.values())
+    start = clock()
+    values = strategy(values, recorder)
+    stats.strategy(strategy.__name__).add(1, clock() - start, before - sum(len(v) for v in values.values()))
+    return values
+
+def reduce_puzzle(values, recorder=None, stats=None):
+    """
+    Apply eliminate, only_choice and naked_twins until no more boxes get solved.
+
+    This is the fixed set of strategies of the strings engine. The configurable
+    pipelines of strategies.py only run in the bitmask engine.
+    Returns:
+        values(dict): the reduced board, or False if a box ran out of candidates.
+    """
     stalled = False
     while not stalled:
         # Check how many boxes have a determined value
         solved_values_before = len([box for box in values.keys() if len(values[box]) == 1])
 
         # Your code here: Use the Eliminate Strategy
-        values = eliminate(values)
+        values = _apply(eliminate, values, recorder, stats)
         # Your code here: Use the Only Choice Strategy
-        values = only_choice(values)
+        values = _apply(only_choice, values, recorder, stats)
         # Use naked_twins Strategy
-        values = naked_twins(values)
+        values = _apply(naked_twins, values, recorder, stats)
         # Check how many boxes have a determined value, to compare
         solved_values_after = len([box for box in values.keys() if len(values[box]) == 1])
         # If no new values were added, stop the loop.
@@ -139,41 +145,148 @@ def reduce_puzzle(values):
             return False
     return values
 
-def search(values):
+def least_constraining(values, box):
+    """Order the digits of a box so the one that rules out the fewest peer candidates comes first."""
+    return sorted(values[box], key=lambda digit: sum(1 for peer in peers[box] if digit in values[peer]))
+
+def random_order(values, box):
+    """Order the digits of a box at random."""
+    # Imported here so solving without it does not pay for the import at startup
+    import random
+    digits = list(values[box])
+    random.shuffle(digits)
+    return digits
+
+# Value ordering heuristics for search, by name
+value_orders = {'lcv': least_constraining, 'random': random_order}
+
+def _value_order(order):
+    """Resolve an `order` argument to None (digits in order) or a function(values, box)."""
+    if order is None or callable(order):
+        return order
+    try:
+        return value_orders[order]
+    except KeyError:
+        raise ValueError('Unknown value order: %r, expected one of %s' % (order, ', '.join(sorted(value_orders))))
+
+def search(values, recorder=None, stats=None, depth=0, order=None):
+    """
+    Solve a board by constraint propagation and depth-first search on the box with fewest possibilities.
+
+    The whole search works on `values` itself. Every change goes through a recorder.Trail
+    and is undone on backtrack, so no board is copied for a branch.
+    Args:
+        values(dict): a dictionary of the form {'box_name': '123456789', ...}, updated in place.
+        recorder(Recorder): optional trace of the changes made, backtracks included.
+        stats(SolverStats): optional search and strategy counters.
+        order: the order to try the digits of a box in. None for ascending, a name from
+            `value_orders` ('lcv' or 'random'), or a function(values, box) returning the digits.
+    Returns:
+        values(dict): the solved board, or False if no solution exists.
+    """
+    return _search(values, Trail(recorder), stats, depth, _value_order(order))
+
+def _search(values, trail, stats, depth, order):
+    if stats is not None:
+        stats.node(depth)
     # First, reduce the puzzle using the previous function
-    values = reduce_puzzle(values)
-    if values is False:
+    if reduce_puzzle(values, trail, stats) is False:
         return False
     if all(len(values[box])==1 for box in boxes):
         return values
     # Choose one of the unfilled squares with the fewest possibilities
     n,mbox = min((len(values[box]),box) for box in boxes if len(values[box])>1)
-    #print("find min box",mbox, n)
-    #display(values)
-    # Now use recursion to solve each one of the resulting sudokus, and if one returns a value (not False), return that answer!
-    for value in values[mbox]:
-        branch_sudoku = values.copy()
-        branch_sudoku[mbox] = value
-        #print("searching...")
-        attempt = search(branch_sudoku)
-        if attempt:
-            #print("inside", mbox, value)
-            #display(attempt)
-            return attempt
-        else:
-            #print("attempt failed", mbox, value, attempt)
-            display(branch_sudoku)
-
-def solve(grid):
+    # Try each value in turn, undoing everything the attempt changed before the next one
+    mark = trail.mark()
+    for value in (values[mbox] if order is None else order(values, mbox)):
+        assign_value(values, mbox, value, trail)
+        if _search(values, trail, stats, depth + 1, order):
+            return values
+        trail.undo(values, mark)
+        if stats is not None:
+            stats.backtrack(depth)
+    return False
+
+def solve(grid, engine='strings', recorder=None, topology=None, stats=None, cache=None, pipeline=(), order=None):
     """
     Find the solution to a Sudoku grid.
     Args:
         grid(string): a string representing a sudoku grid.
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        engine(string): 'strings' to solve with the dictionary functions in this module,
+            'bitmask' to solve with the integer mask engine in bitboard.py,
+            'dlx' to solve with the exact cover engine in dlx.py.
+        recorder(Recorder): optional recorder.Recorder that traces every change made
+            to the board. Only the 'strings' engine records.
+        topology(Topology): board layout from topology.get_topology for the 'bitmask'
+            and 'dlx' engines. Defaults to 9x9 diagonal sudoku.
+        stats(SolverStats): optional stats.SolverStats that collects per-strategy and
+            search counters.
+        cache(TranspositionCache): optional cache.TranspositionCache shared between
+            solves, which remembers solved puzzles and dead-end boards up to symmetry.
+            Only the 'bitmask' engine uses a cache, and it solves on the cache's topology.
+        pipeline(tuple): names of further strategies from strategies.py for the 'bitmask'
+            engine to try whenever propagation stalls, e.g. strategies.default_pipeline.
+            Only the 'bitmask' engine runs a pipeline; the strings engine always uses
+            eliminate, only_choice and naked_twins.
+        order: value ordering for the 'strings' and 'bitmask' search, e.g. 'lcv' or 'random'.
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
     """
-    return(search(grid_values(grid)))
+    if recorder is not None and engine != 'strings':
+        raise ValueError('Only the strings engine supports recording')
+    if (cache is not None or pipeline) and engine != 'bitmask':
+        raise ValueError('Only the bitmask engine supports caching and strategy pipelines')
+    if order is not None and engine not in ('strings', 'bitmask'):
+        raise ValueError('The %s engine has no value ordering' % engine)
+    if engine == 'bitmask':
+        if cache is not None:
+            if topology is not None and topology is not cache.topo:
+                raise ValueError('The cache was built for a different topology')
+            if pipeline or order is not None:
+                raise ValueError('The cache solves without a strategy pipeline or value order')
+            return cache.solve(grid, stats)
+        import bitboard
+        return bitboard.solve(grid, topology, stats, pipeline, order)
+    if engine == 'dlx':
+        import dlx
+        return dlx.solve(grid, topology, stats)
+    if engine != 'strings':
+        raise ValueError('Unknown engine: %r' % (engine,))
+    if topology is not None:
+        raise ValueError('The strings engine only solves 9x9 diagonal sudoku')
+    values = grid_values(grid)
+    if recorder is not None:
+        recorder.start(values)
+    if stats is None:
+        return(search(values, recorder, order=order))
+    start = clock()
+    values = search(values, recorder, stats, order=order)
+    stats.finish(clock() - start, values)
+    return values
+
+def count_solutions(grid, limit=2, topology=None):
+    """
+    Count the solutions of a Sudoku grid, stopping as soon as `limit` are found.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): the most solutions worth counting, at least 1. None enumerates them all.
+        topology(Topology): board layout, defaults to 9x9 diagonal sudoku.
+    Returns:
+        The number of solutions, at most `limit`.
+    """
+    import bitboard
+    return bitboard.count_solutions(bitboard.grid_masks(grid, topology), limit, topology)
+
+def is_unique(grid, topology=None):
+    """
+    Check that a Sudoku grid has exactly one solution.
+    Args:
+        grid(string): a string representing a sudoku grid.
+    Returns:
+        True if the grid has a single solution, False if it has none or several.
+    """
+    return count_solutions(grid, 2, topology) == 1
 
 boxes = cross(rows, cols)
 row_units = [cross(r, cols) for r in rows]
@@ -182,8 +295,11 @@ square_units = [cross(rs, cs) for rs in ('ABC','DEF','GHI') for cs in ('123','45
 diagonal1 = [[r+c for (r,c) in zip(rows, cols)]]
 diagonal2 = [[r+c for (r,c) in zip(rows, reversed(cols))]]
 unitlist = row_units + column_units + square_units + diagonal1 + diagonal2
-units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
-peers = dict((s, set(sum(units[s],[]))-set([s])) for s in boxes)
+units = dict((s, []) for s in boxes)
+for unit in unitlist:
+    for s in unit:
+        units[s].append(unit)
+peers = dict((s, set().union(*units[s])-set([s])) for s in boxes)
 
 if __name__ == '__main__':
     diag_sudoku_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
@@ -191,10 +307,12 @@ if __name__ == '__main__':
     print("unsolved")
     display(unsolved)
     print("-----------------")
-    display(solve(diag_sudoku_grid))
+    from recorder import Recorder
+    recorder = Recorder()
+    display(solve(diag_sudoku_grid, recorder=recorder))
     try:
         from visualize import visualize_assignments
-        visualize_assignments(assignments)
+        visualize_assignments(recorder)
 
     except SystemExit:
         pass
@@ -0,0 +1,112 @@
+"""
+Solver instrumentation.
+
+Pass a SolverStats to `solution.solve(grid, engine='bitmask', stats=SolverStats())`
+(or to the bitboard/dlx functions directly) to collect, for each strategy, how
+often it ran, how long it took and how many candidates it removed, along with
+search nodes, maximum depth and backtracks. Counters are plain integer
+additions, cheap enough to leave on in production. Stats from many solves or
+worker processes can be combined with `merge` and exported with `summary`.
+"""
+import time
+
+clock = time.perf_counter
+
+
+class StrategyStats(object):
+    """Counters for one inference strategy."""
+    __slots__ = ('calls', 'seconds', 'removed')
+
+    def __init__(self, calls=0, seconds=0.0, removed=0):
+        self.calls = calls
+        self.seconds = seconds
+        self.removed = removed
+
+    def add(self, calls, seconds, removed):
+        self.calls += calls
+        self.seconds += seconds
+        self.removed += removed
+
+    def summary(self):
+        return {'calls': self.calls, 'seconds': self.seconds, 'removed': self.removed}
+
+
+class SolverStats(object):
+    """
+    Counters collected across one or more solves.
+
+    Args:
+        hook(callable): optional profiling hook, called as hook(event, depth) for
+            every 'node' entered and every 'backtrack' out of a failed branch.
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.strategies = {}
+        self.solves = 0
+        self.solved = 0
+        self.seconds = 0.0
+        self.nodes = 0
+        self.max_depth = 0
+        self.backtracks = 0
+
+    def strategy(self, name):
+        """Return the counters of a strategy, creating them on first use."""
+        counters = self.strategies.get(name)
+        if counters is None:
+            counters = self.strategies[name] = StrategyStats()
+        return counters
+
+    def node(self, depth):
+        """Count a search node at the given depth."""
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.hook is not None:
+            self.hook('node', depth)
+
+    def backtrack(self, depth):
+        """Count a branch that failed below the given depth."""
+        self.backtracks += 1
+        if self.hook is not None:
+            self.hook('backtrack', depth)
+
+    def finish(self, seconds, solved):
+        """Count one complete solve."""
+        self.solves += 1
+        self.solved += bool(solved)
+        self.seconds += seconds
+
+    def merge(self, other):
+        """Add the counters of another SolverStats into this one."""
+        for name, counters in other.strategies.items():
+            self.strategy(name).add(counters.calls, counters.seconds, counters.removed)
+        self.solves += other.solves
+        self.solved += other.solved
+        self.seconds += other.seconds
+        self.nodes += other.nodes
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.backtracks += other.backtracks
+        return self
+
+    def summary(self):
+        """Return the counters as a JSON-serializable dictionary."""
+        return {
+            'solves': self.solves,
+            'solved': self.solved,
+            'seconds': self.seconds,
+            'nodes': self.nodes,
+            'max_depth': self.max_depth,
+            'backtracks': self.backtracks,
+            'strategies': dict((name, c.summary()) for name, c in self.strategies.items()),
+        }
+
+    def __getstate__(self):
+        # Hooks are usually closures or bound methods, so they stay in their own process
+        state = dict(self.__dict__)
+        state['hook'] = None
+        return state
+
+    def __repr__(self):
+        return 'SolverStats(solves=%d, nodes=%d, max_depth=%d, backtracks=%d)' % (
+            self.solves, self.nodes, self.max_depth, self.backtracks)
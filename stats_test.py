@@ -0,0 +1,55 @@
+import batch
+import bitboard
+import dlx
+import io
+import pickle
+import solution
+import unittest
+from contextlib import redirect_stdout
+
+import benchmark
+from stats import SolverStats
+
+
+class TestSolverStats(unittest.TestCase):
+    grids = benchmark.load_corpus('diagonal')[0][:5]
+
+    def test_bitmask_counters(self):
+        stats = SolverStats()
+        for grid in self.grids:
+            bitboard.solve_grid(grid, stats=stats)
+        self.assertEqual((stats.solves, stats.solved), (5, 5))
+        self.assertGreaterEqual(stats.nodes, 5)
+        self.assertEqual(set(stats.strategies), set(['eliminate', 'only_choice', 'naked_twins']))
+        removed = sum(c.removed for c in stats.strategies.values())
+        # Every candidate of every empty box except the solution digit gets removed somewhere
+        self.assertGreaterEqual(removed, sum(grid.count('.') for grid in self.grids) * 8)
+
+    def test_hook(self):
+        events = []
+        stats = SolverStats(hook=lambda event, depth: events.append((event, depth)))
+        dlx.solve(self.grids[0], stats=stats)
+        self.assertEqual(events.count(('node', 0)), 1)
+        self.assertEqual(len([e for e in events if e[0] == 'node']), stats.nodes)
+        self.assertEqual(max(depth for _, depth in events), stats.max_depth)
+        self.assertIsNone(pickle.loads(pickle.dumps(stats)).hook)
+
+    def test_strings_engine_is_quiet(self):
+        stats = SolverStats()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            solution.solve(self.grids[0], stats=stats)
+        self.assertEqual(out.getvalue(), '')
+        self.assertGreater(stats.strategy('eliminate').calls, 0)
+        self.assertGreaterEqual(stats.nodes, 1)
+
+    def test_batch_merge(self):
+        single, pooled = SolverStats(), SolverStats()
+        list(batch.solve_many(self.grids, workers=1, stats=single))
+        list(batch.solve_many(self.grids, workers=2, chunksize=2, stats=pooled))
+        self.assertEqual(pooled.summary()['nodes'], single.summary()['nodes'])
+        self.assertEqual(pooled.solves, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
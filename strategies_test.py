@@ -0,0 +1,103 @@
+import benchmark
+import bitboard
+import solution
+import strategies
+import unittest
+
+from stats import SolverStats
+from topology import diagonal, get_topology
+from topology_test import is_valid
+
+
+def board(**boxes):
+    """An empty board with the given boxes restricted to the given digits, e.g. A1='12'."""
+    masks = [diagonal.all_digits] * len(diagonal.boxes)
+    for box, digits in boxes.items():
+        masks[diagonal.box_index[box]] = sum(diagonal.digit_mask[d] for d in digits)
+    return masks
+
+
+def without(digit, names):
+    """Restrict every named box to the digits other than `digit`."""
+    return dict((box, diagonal.digits.replace(digit, '')) for box in names)
+
+
+def has(masks, box, digit):
+    return bool(masks[diagonal.box_index[box]] & diagonal.digit_mask[digit])
+
+
+class TestStrategies(unittest.TestCase):
+    row_a = ['A%d' % c for c in range(1, 10)]
+    square = ['%s%d' % (r, c) for r in 'ABC' for c in (1, 2, 3)]
+
+    def test_pointing(self):
+        # In the top left square, 1 can only go in row A
+        masks = board(**without('1', self.square[3:]))
+        changed = strategies.pointing(masks, diagonal)
+        self.assertEqual(sorted(diagonal.boxes[i] for i in changed), self.row_a[3:])
+        self.assertFalse(any(has(masks, box, '1') for box in self.row_a[3:]))
+
+    def test_box_line(self):
+        # In row A, 1 can only go in the top left square
+        masks = board(**without('1', self.row_a[3:]))
+        strategies.box_line(masks, diagonal)
+        self.assertFalse(any(has(masks, box, '1') for box in self.square[3:]))
+        self.assertTrue(all(has(masks, box, '1') for box in self.row_a[:3]))
+
+    def test_naked_pairs(self):
+        masks = board(A4='12', A8='12')
+        strategies.registry['naked_pairs'](masks, diagonal)
+        for box in self.row_a:
+            self.assertEqual(has(masks, box, '1'), box in ('A4', 'A8'))
+        self.assertFalse(strategies.registry['naked_triples'](board(A1='12', A2='12', A3='12'), diagonal))
+
+    def test_hidden_pairs(self):
+        # In row A, 1 and 2 can only go in A1 and A2
+        masks = board(**dict((box, '3456789') for box in self.row_a[2:]))
+        changed = strategies.registry['hidden_pairs'](masks, diagonal)
+        self.assertEqual(sorted(diagonal.boxes[i] for i in changed), ['A1', 'A2'])
+        self.assertEqual(bitboard.masks_to_values(masks)['A1'], '12')
+
+    def test_x_wing(self):
+        # 1 can only go in columns 2 and 6 of rows A and E
+        masks = board(**dict(without('1', ['A%d' % c for c in (1, 3, 4, 5, 7, 8, 9)]),
+                             **without('1', ['E%d' % c for c in (1, 3, 4, 5, 7, 8, 9)])))
+        strategies.x_wing(masks, diagonal)
+        for r in diagonal.rows:
+            self.assertEqual(has(masks, r + '2', '1'), r in 'AE')
+            self.assertEqual(has(masks, r + '6', '1'), r in 'AE')
+
+    def test_resolve(self):
+        self.assertEqual(strategies.resolve(['x_wing'])[0], ('x_wing', strategies.x_wing))
+        with self.assertRaises(ValueError):
+            strategies.resolve(['swordfish'])
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_fewer_nodes(self):
+        grids, topo = benchmark.load_corpus('17clue')
+        plain, piped = SolverStats(), SolverStats()
+        for grid in grids[:20]:
+            expected = bitboard.solve_grid(grid, topo, plain)
+            self.assertEqual(bitboard.solve_grid(grid, topo, piped, strategies.default_pipeline), expected)
+        self.assertLess(piped.nodes, plain.nodes)
+        self.assertIn('pointing', piped.summary()['strategies'])
+
+    def test_every_strategy(self):
+        names = sorted(strategies.registry)
+        for topo in (diagonal, get_topology(2, windoku=True), get_topology(3, diagonals=False)):
+            grid = '1' + '.' * (len(topo.boxes) - 1)
+            self.assertTrue(is_valid(bitboard.solve_grid(grid, topo, pipeline=names), topo))
+        self.assertEqual(bitboard.count_solutions(bitboard.grid_masks('11' + '.' * 79), pipeline=names), 0)
+
+    def test_solution_solve(self):
+        grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        self.assertEqual(solution.solve(grid, engine='bitmask', pipeline=strategies.default_pipeline),
+                         solution.solve(grid))
+        with self.assertRaises(ValueError):
+            solution.solve(grid, pipeline=strategies.default_pipeline)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Streaming solver for large puzzle files.
+
+Usage:
+    python stream.py [-o OUTPUT] [--packed] [-w WORKERS] [-c CHUNKSIZE] [-e ENGINE] [INPUT]
+
+Reads one 81-char puzzle per line from INPUT (or stdin when INPUT is '-' or
+omitted), using '.' or '0' for empty boxes. Blank lines and lines starting
+with '#' are skipped. Files are memory-mapped and solutions are written as
+they arrive, so memory use does not grow with the size of the input.
+
+INPUT may also be a file in the packed binary format of packed.py, and
+--packed writes the solutions in that format, with an empty board for each
+unsolvable puzzle.
+"""
+import argparse
+import mmap
+import os
+import sys
+
+import packed
+from batch import SolverPool
+
+
+def parse_line(line, lineno=None):
+    """
+    Normalize one input line into a grid string.
+    Returns:
+        The 81-char grid with '.' for empty boxes, or None for blank and comment lines.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    if len(line) != 81:
+        raise ValueError('line %s: expected 81 characters, got %d' % (lineno, len(line)))
+    return line.replace('0', '.')
+
+
+def _iter_lines(path):
+    """Yield the raw lines of a file through mmap, or of stdin for '-'."""
+    if path == '-':
+        for line in sys.stdin:
+            yield line
+        return
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for line in iter(mm.readline, b''):
+                yield line.decode('ascii')
+        finally:
+            mm.close()
+
+
+def iter_puzzles(path):
+    """
+    Yield the puzzles in a file one at a time.
+    Args:
+        path(string): a text or packed file name, or '-' for stdin.
+    """
+    if path != '-' and packed.is_packed(path):
+        with packed.PackedReader(path) as reader:
+            for grid in reader:
+                yield grid
+        return
+    for lineno, line in enumerate(_iter_lines(path), 1):
+        grid = parse_line(line, lineno)
+        if grid is not None:
+            yield grid
+
+
+def write_solutions(results, out):
+    """
+    Write one solution per line as results arrive.
+    Args:
+        results(iterable): (index, solution) pairs as yielded by `SolverPool.solve_many`.
+        out(file): a text file opened for writing.
+    Returns:
+        A (solved, unsolvable) tuple of counts.
+    """
+    solved = unsolvable = 0
+    for _, result in results:
+        if result:
+            solved += 1
+            out.write(result + '\n')
+        else:
+            unsolvable += 1
+            out.write('unsolvable\n')
+    return solved, unsolvable
+
+
+def write_packed(results, writer):
+    """
+    Like `write_solutions`, into a packed.PackedWriter. Unsolvable puzzles are stored as an empty board.
+    """
+    solved = unsolvable = 0
+    for _, result in results:
+        if result:
+            solved += 1
+        else:
+            unsolvable += 1
+            result = '.' * 81
+        writer.write(result)
+    return solved, unsolvable
+
+
+def solve_file(path, out, workers=None, chunksize=256, engine='bitmask'):
+    """
+    Solve every puzzle in a file, writing solutions to `out` in input order.
+    Args:
+        out: a text file, or a packed.PackedWriter for packed output.
+    Returns:
+        A (solved, unsolvable) tuple of counts.
+    """
+    write = write_packed if isinstance(out, packed.PackedWriter) else write_solutions
+    with SolverPool(workers, engine) as pool:
+        return write(pool.solve_many(iter_puzzles(path), chunksize), out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a file of diagonal sudoku puzzles, one per line.')
+    parser.add_argument('input', nargs='?', default='-', help="puzzle file, or '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default='-', help="solution file, or '-' for stdout (default)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('-c', '--chunksize', type=int, default=256, help='puzzles per worker task')
+    parser.add_argument('-e', '--engine', default='bitmask', help='solver engine (default: bitmask)')
+    parser.add_argument('--packed', action='store_true', help='write the solutions in the packed binary format')
+    args = parser.parse_args(argv)
+
+    if args.packed:
+        if args.output == '-':
+            parser.error('--packed needs an output file')
+        with packed.PackedWriter(args.output) as out:
+            solved, unsolvable = solve_file(args.input, out, args.workers, args.chunksize, args.engine)
+    elif args.output == '-':
+        solved, unsolvable = solve_file(args.input, sys.stdout, args.workers, args.chunksize, args.engine)
+    else:
+        with open(args.output, 'w') as out:
+            solved, unsolvable = solve_file(args.input, out, args.workers, args.chunksize, args.engine)
+    sys.stderr.write('%d solved, %d unsolvable\n' % (solved, unsolvable))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import io
+import os
+import stream
+import tempfile
+import unittest
+
+import batch_test
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write('# diagonal puzzles\n')
+            for grid in batch_test.TestSolveMany.grids:
+                f.write(grid.replace('.', '0') + '\n\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_puzzles(self):
+        self.assertEqual(list(stream.iter_puzzles(self.path)), batch_test.TestSolveMany.grids)
+
+    def test_bad_line(self):
+        with self.assertRaises(ValueError):
+            stream.parse_line('123', 7)
+
+    def test_solve_file(self):
+        for workers in (1, 2):
+            out = io.StringIO()
+            self.assertEqual(stream.solve_file(self.path, out, workers, chunksize=4), (9, 1))
+            expected = [result or 'unsolvable' for _, result in batch_test.TestSolveMany().expected()]
+            self.assertEqual(out.getvalue().splitlines(), expected)
+
+    def test_empty_file(self):
+        open(self.path, 'w').close()
+        self.assertEqual(list(stream.iter_puzzles(self.path)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,275 @@
+"""
+Board topologies for N^2 x N^2 sudoku variants.
+
+A Topology holds the integer index tables the bitmask and exact cover
+engines solve with: the boxes of every unit, the units of every box and the
+peers of every box. Tables are built once per configuration and cached by
+`get_topology`, so one process can solve mixed board types without
+rebuilding them.
+
+Boxes are named like `solution.boxes`: a row letter followed by a column
+number, e.g. 'A1' or 'P16'. Digits beyond 9 are written as letters, so a
+16x16 board uses '123456789ABCDEFG'.
+
+Building the tables is the slow part of creating a Topology (around 200 ms
+for 16x16, whose mask tables have 65536 entries), so saved tables are loaded
+with marshal from `tables_dir` when they exist. Run `python topology.py` to
+write the tables of the common boards ahead of time, e.g. while building a
+deployment image. Importing this module never writes anything unless the
+SUDOKU_TABLES environment variable names a directory: tables are then loaded
+from there, and the tables of any other configuration are saved there the
+first time they are built. Topologies with extra units are always built in
+memory.
+
+Usage:
+    python topology.py [DIRECTORY]
+"""
+import marshal
+import os
+import sys
+
+symbols = '123456789ABCDEFGHIJKLMNOP'
+row_names = 'ABCDEFGHIJKLMNOPQRSTUVWXY'
+
+# Boards with more digits than this compute mask lookups on demand instead of
+# building a table with an entry for every possible mask
+max_table_digits = 16
+
+# Where saved tables are loaded from; None or '' disables loading them
+tables_dir = os.environ.get('SUDOKU_TABLES', os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__'))
+
+# Whether tables built in this process are saved to `tables_dir`; only when SUDOKU_TABLES asks for it
+save_built = bool(os.environ.get('SUDOKU_TABLES'))
+
+# Bump when the table layout changes so older saved tables are ignored
+_tables_version = 1
+
+# Tables every saved configuration has; the mask tables are only saved when built
+_index_tables = ('unit_table', 'units_of', 'peer_table')
+
+# Configurations `python topology.py` saves: (box_size, diagonals, windoku)
+common = [(box_size, diagonals, False) for box_size in (2, 3, 4) for diagonals in (True, False)] + [(3, False, True)]
+
+
+class _Computed(object):
+    """Stands in for a mask lookup table that would be too large to build."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __getitem__(self, mask):
+        return self.func(mask)
+
+
+def _mask_table(func, size):
+    if size > max_table_digits:
+        return _Computed(func)
+    return tuple(func(m) for m in range(1 << size))
+
+
+def _build_mask_tables(digits):
+    """The lookups from a candidate mask to its number of candidates and to its digits."""
+    size = len(digits)
+    return {
+        'bit_count': _mask_table(lambda m: bin(m).count('1'), size),
+        'mask_digits': _mask_table(lambda m: ''.join(d for i, d in enumerate(digits) if m >> i & 1), size),
+    }
+
+
+def _tables_path(key, directory):
+    box_size, diagonals, windoku, extra_units = key
+    return os.path.join(directory, 'topology-%d%s%s.v%d.%s.marshal' % (
+        box_size, '-diagonal' if diagonals else '', '-windoku' if windoku else '',
+        _tables_version, sys.implementation.cache_tag))
+
+
+def _load_tables(key, directory=None):
+    """
+    Load the saved tables of a configuration.
+    Returns:
+        The tables by attribute name, or None when they are not saved or unreadable.
+    """
+    directory = tables_dir if directory is None else directory
+    if not directory or key[3]:
+        return None
+    try:
+        with open(_tables_path(key, directory), 'rb') as f:
+            saved = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(saved, dict) or saved.pop('key', None) != key[:3]:
+        return None
+    if any(not isinstance(saved.get(name), tuple) for name in _index_tables):
+        return None
+    return saved
+
+
+def _save_tables(key, tables, directory=None):
+    """Save the tables of a configuration, quietly giving up when the directory is not writable."""
+    directory = tables_dir if directory is None else directory
+    if not directory or key[3]:
+        return False
+    saved = dict((name, table) for name, table in tables.items() if isinstance(table, tuple))
+    saved['key'] = key[:3]
+    path = _tables_path(key, directory)
+    temp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(temp, 'wb') as f:
+            marshal.dump(saved, f)
+        # Readers in other processes see either no file or a complete one
+        os.replace(temp, path)
+    except OSError:
+        return False
+    return True
+
+
+class Topology(object):
+    """
+    The units and peers of a sudoku board.
+
+    Args:
+        box_size(int): side of a square, so the board has box_size**2 rows and columns.
+        diagonals(bool): add the two main diagonals as units.
+        windoku(bool): add the windoku windows, squares offset by one box from the regular ones.
+        extra_units(tuple): further units, each a tuple of box names covering exactly one row's worth of boxes.
+    """
+
+    def __init__(self, box_size=3, diagonals=True, windoku=False, extra_units=()):
+        size = box_size * box_size
+        if not 1 < box_size <= 5:
+            raise ValueError('box_size must be between 2 and 5, got %r' % (box_size,))
+        self.box_size = box_size
+        self.size = size
+        self.diagonals = diagonals
+        self.windoku = windoku
+        self.extra_units = tuple(tuple(unit) for unit in extra_units)
+
+        self.digits = symbols[:size]
+        self.rows = row_names[:size]
+        self.cols = [str(c) for c in range(1, size + 1)]
+        self.boxes = [r + c for r in self.rows for c in self.cols]
+        self.box_index = dict((box, i) for i, box in enumerate(self.boxes))
+
+        tables = _load_tables(self.key())
+        if tables is None:
+            tables = self._build_tables()
+            if save_built:
+                _save_tables(self.key(), tables)
+        # unit_table[u] is a tuple of the box indexes in unit u
+        self.unit_table = tables['unit_table']
+        # units_of[i] is a tuple of the unit indexes that contain box i
+        self.units_of = tables['units_of']
+        # peer_table[i] is a tuple of the box indexes that share a unit with box i
+        self.peer_table = tables['peer_table']
+
+        # Candidate masks: bit d is set when self.digits[d] is still possible
+        self.all_digits = (1 << size) - 1
+        self.digit_mask = dict((d, 1 << i) for i, d in enumerate(self.digits))
+        if 'bit_count' not in tables:
+            # Computed lookups of large boards are never saved
+            tables.update(_build_mask_tables(self.digits))
+        self.bit_count = tables['bit_count']
+        self.mask_digits = tables['mask_digits']
+
+    def _build_tables(self):
+        """Build the index and mask tables. Returns them in a dictionary by attribute name."""
+        size, box_size = self.size, self.box_size
+
+        def at(r, c):
+            return r * size + c
+
+        line = range(size)
+        units = [tuple(at(r, c) for c in line) for r in line]
+        units += [tuple(at(r, c) for r in line) for c in line]
+        squares = range(0, size, box_size)
+        units += [tuple(at(r + i, c + j) for i in range(box_size) for j in range(box_size))
+                  for r in squares for c in squares]
+        if self.diagonals:
+            units.append(tuple(at(i, i) for i in line))
+            units.append(tuple(at(i, size - 1 - i) for i in line))
+        if self.windoku:
+            windows = range(1, size - box_size + 1, box_size + 1)
+            units += [tuple(at(r + i, c + j) for i in range(box_size) for j in range(box_size))
+                      for r in windows for c in windows]
+        for unit in self.extra_units:
+            if len(unit) != size or len(set(unit)) != size:
+                raise ValueError('extra units must hold %d distinct boxes: %r' % (size, unit))
+            for box in unit:
+                if box not in self.box_index:
+                    raise ValueError('unknown box %r in extra unit %r' % (box, unit))
+            units.append(tuple(self.box_index[box] for box in unit))
+
+        units_of = [[] for _ in self.boxes]
+        for u, unit in enumerate(units):
+            for i in unit:
+                units_of[i].append(u)
+        tables = {
+            'unit_table': tuple(units),
+            'units_of': tuple(tuple(u) for u in units_of),
+            'peer_table': tuple(tuple(sorted(set(j for u in units_of[i] for j in units[u]) - set([i])))
+                                for i in range(len(self.boxes))),
+        }
+        tables.update(_build_mask_tables(self.digits))
+        return tables
+
+    @property
+    def unitlist(self):
+        """The units as lists of box names, like `solution.unitlist`."""
+        return [[self.boxes[i] for i in unit] for unit in self.unit_table]
+
+    def key(self):
+        """The arguments that rebuild this topology through `get_topology`."""
+        return (self.box_size, self.diagonals, self.windoku, self.extra_units)
+
+    def __reduce__(self):
+        # Unpickle through the cache so worker processes share one copy per configuration
+        return (get_topology, self.key())
+
+    def __repr__(self):
+        return 'Topology(box_size=%d, diagonals=%r, windoku=%r, extra_units=%d)' % (
+            self.box_size, self.diagonals, self.windoku, len(self.extra_units))
+
+
+_cache = {}
+
+
+def get_topology(box_size=3, diagonals=True, windoku=False, extra_units=()):
+    """
+    Return the cached Topology for a configuration, building it on first use.
+    """
+    key = (box_size, bool(diagonals), bool(windoku), tuple(tuple(unit) for unit in extra_units))
+    topo = _cache.get(key)
+    if topo is None:
+        topo = _cache[key] = Topology(*key)
+    return topo
+
+
+# The 9x9 diagonal sudoku solved by solution.py
+diagonal = get_topology(3, True)
+
+
+def save_common(directory=None):
+    """
+    Build and save the tables of the `common` configurations.
+    Returns:
+        The paths written.
+    """
+    directory = tables_dir if directory is None else directory
+    if not directory:
+        raise ValueError('no tables directory: set SUDOKU_TABLES or pass one')
+    paths = []
+    for box_size, diagonals, windoku in common:
+        topo = get_topology(box_size, diagonals, windoku)
+        key = topo.key()
+        # Rebuilt rather than taken from topo, which may have loaded them from an older file
+        if not _save_tables(key, topo._build_tables(), directory):
+            raise OSError('could not write the tables to %s' % directory)
+        paths.append(_tables_path(key, directory))
+    return paths
+
+
+if __name__ == '__main__':
+    for path in save_common(sys.argv[1] if len(sys.argv) > 1 else None):
+        print(path)
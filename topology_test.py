@@ -0,0 +1,142 @@
+import bitboard
+import dlx
+import os
+import pickle
+import shutil
+import solution
+import tempfile
+import topology
+import unittest
+
+from topology import get_topology, diagonal
+
+_saved_settings = None
+
+
+def setUpModule():
+    # Topologies built by these tests neither load from nor write to the source tree
+    global _saved_settings
+    _saved_settings = topology.tables_dir, topology.save_built
+    topology.tables_dir, topology.save_built = tempfile.mkdtemp(), False
+
+
+def tearDownModule():
+    shutil.rmtree(topology.tables_dir)
+    topology.tables_dir, topology.save_built = _saved_settings
+
+
+def is_valid(grid, topo):
+    """Check a solved grid against every unit of a topology."""
+    return all(len(set(grid[i] for i in unit)) == topo.size for unit in topo.unit_table) and '.' not in grid
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_default_matches_solution(self):
+        self.assertEqual(diagonal.boxes, solution.boxes)
+        self.assertEqual(diagonal.unitlist, solution.unitlist)
+        for i, box in enumerate(diagonal.boxes):
+            self.assertEqual(set(diagonal.boxes[p] for p in diagonal.peer_table[i]), solution.peers[box])
+
+    def test_cached(self):
+        self.assertIs(get_topology(4, diagonals=False), get_topology(4, False))
+        self.assertIs(pickle.loads(pickle.dumps(diagonal)), diagonal)
+
+    def test_unit_counts(self):
+        self.assertEqual(len(get_topology(2, diagonals=False).unit_table), 12)
+        self.assertEqual(len(get_topology(3, windoku=True).unit_table), 27 + 2 + 4)
+        self.assertEqual(len(get_topology(4).unit_table), 48 + 2)
+        self.assertEqual(get_topology(4).digits, '123456789ABCDEFG')
+        self.assertEqual(get_topology(4).boxes[-1], 'P16')
+
+    def test_extra_units(self):
+        topo = get_topology(2, diagonals=False, extra_units=[('A1', 'A2', 'B1', 'D4')])
+        self.assertEqual(topo.unitlist[-1], ['A1', 'A2', 'B1', 'D4'])
+        with self.assertRaises(ValueError):
+            get_topology(2, extra_units=[('A1', 'A2')])
+        # E1 and A5 are off a 4x4 board
+        for unit in (('A1', 'A2', 'B1', 'E1'), ('A1', 'A2', 'B1', 'A5')):
+            with self.assertRaises(ValueError):
+                get_topology(2, extra_units=[unit])
+
+    def test_solve_sizes(self):
+        for topo in (get_topology(2), get_topology(3, windoku=True), get_topology(4, diagonals=False)):
+            grid = bitboard.solve_grid('.' * len(topo.boxes), topo)
+            self.assertTrue(is_valid(grid, topo))
+            values = dlx.solve(grid[:-topo.size] + '.' * topo.size, topo)
+            self.assertEqual(''.join(values[box] for box in topo.boxes), grid)
+
+    def test_solution_api(self):
+        topo = get_topology(2, diagonals=False)
+        values = solution.solve('1...' + '.' * 12, engine='bitmask', topology=topo)
+        self.assertEqual(values['A1'], '1')
+        self.assertEqual(solution.count_solutions('.' * 16, limit=None, topology=topo), 288)
+        with self.assertRaises(ValueError):
+            solution.solve('.' * 16, topology=topo)
+
+
+class TestSavedTables(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        for topo in (diagonal, get_topology(2, windoku=True), get_topology(5)):
+            tables = topo._build_tables()
+            self.assertIsNone(topology._load_tables(topo.key(), self.dir))
+            self.assertTrue(topology._save_tables(topo.key(), tables, self.dir))
+            loaded = topology._load_tables(topo.key(), self.dir)
+            for name in ('unit_table', 'units_of', 'peer_table'):
+                self.assertEqual(loaded[name], getattr(topo, name))
+            # 25x25 mask lookups are computed, not saved
+            self.assertEqual('bit_count' in loaded, topo.size <= topology.max_table_digits)
+
+    def test_loaded_topology(self):
+        key = (4, True, False, ())
+        topology._save_tables(key, get_topology(4)._build_tables(), self.dir)
+        saved, topology.tables_dir = topology.tables_dir, self.dir
+        try:
+            topo = topology.Topology(4)
+        finally:
+            topology.tables_dir = saved
+        for name in ('unit_table', 'peer_table', 'bit_count', 'mask_digits'):
+            self.assertEqual(getattr(topo, name), getattr(get_topology(4), name))
+
+    def test_saving_opt_in(self):
+        saved = topology.tables_dir
+        topology.tables_dir = self.dir
+        try:
+            topology.Topology(2, windoku=True)
+            self.assertEqual(os.listdir(self.dir), [])
+            topology.save_built = True
+            topo = topology.Topology(2, windoku=True)
+            self.assertEqual(os.listdir(self.dir), [os.path.basename(topology._tables_path(topo.key(), self.dir))])
+        finally:
+            topology.tables_dir, topology.save_built = saved, False
+
+    def test_unusable_files(self):
+        key = diagonal.key()
+        topology._save_tables(key, diagonal._build_tables(), self.dir)
+        path = topology._tables_path(key, self.dir)
+        with open(path, 'r+b') as f:
+            f.truncate(100)
+        self.assertIsNone(topology._load_tables(key, self.dir))
+        # Tables of one configuration are never loaded for another
+        topology._save_tables(key, diagonal._build_tables(), self.dir)
+        os.rename(path, topology._tables_path((3, False, False, ()), self.dir))
+        self.assertIsNone(topology._load_tables((3, False, False, ()), self.dir))
+        # Neither saved when turned off nor for custom units
+        self.assertFalse(topology._save_tables(key, {}, ''))
+        self.assertFalse(topology._save_tables((2, False, False, (('A1', 'A2', 'B1', 'D4'),)), {}, self.dir))
+
+    def test_save_common(self):
+        paths = topology.save_common(self.dir)
+        self.assertEqual(len(paths), len(topology.common))
+        self.assertEqual(sorted(os.listdir(self.dir)), sorted(os.path.basename(p) for p in paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Vectorized constraint propagation over batches of boards with NumPy.
+
+A batch of K boards is held as a (K, boxes) uint16 array of candidate masks
+in the same bit layout as bitboard.py. Elimination and only_choice run as
+array operations over every board at once, using padded peer and unit index
+arrays derived from the topology. Boards that propagation alone cannot
+finish are handed to the per-board `bitboard.search`.
+
+NumPy is optional: importing this module works without it, but the solving
+functions raise ImportError.
+"""
+import bitboard
+from topology import diagonal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Index arrays already built, keyed by topology
+_tables = {}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('vectorized.py needs NumPy: pip install numpy')
+
+
+def _index_arrays(topo):
+    """
+    Return the NumPy lookup arrays of a topology, building them on first use.
+
+    Ragged tables are padded with an index one past the end, which callers
+    point at a column of zeros so padding never contributes a candidate.
+    """
+    tables = _tables.get(topo)
+    if tables is None:
+        _require_numpy()
+        if topo.size > 16:
+            raise ValueError('vectorized propagation supports boards of up to 16 digits')
+        nboxes, size = len(topo.boxes), topo.size
+        width = max(len(peers) for peers in topo.peer_table)
+        peers = np.full((nboxes, width), nboxes, dtype=np.intp)
+        for i, row in enumerate(topo.peer_table):
+            peers[i, :len(row)] = row
+        units = np.array(topo.unit_table, dtype=np.intp)
+        # Flat positions in a (units, size) array of every (unit, slot) holding box i
+        width = max(len(u) for u in topo.units_of)
+        slots = np.full((nboxes, width), units.size, dtype=np.intp)
+        for i, row in enumerate(topo.units_of):
+            for j, u in enumerate(row):
+                slots[i, j] = u * size + topo.unit_table[u].index(i)
+        counts = np.array([bin(m).count('1') for m in range(1 << size)], dtype=np.uint8)
+        tables = _tables[topo] = (peers, units, slots, counts)
+    return tables
+
+
+def grids_to_array(grids, topo=None):
+    """
+    Convert grid strings into a (K, boxes) array of candidate masks.
+    Args:
+        grids(list): grid strings using '.' or '0' for empty boxes.
+    """
+    _require_numpy()
+    topo = topo or diagonal
+    nboxes = len(topo.boxes)
+    # One grid of the wrong length would shift every grid after it onto the wrong boxes
+    for k, grid in enumerate(grids):
+        if len(grid) != nboxes:
+            raise ValueError('expected grids of %d boxes, got %d for grid %d' % (nboxes, len(grid), k))
+    lookup = np.full(256, topo.all_digits, dtype=np.uint16)
+    for d, m in topo.digit_mask.items():
+        lookup[ord(d)] = m
+    data = np.frombuffer(''.join(grids).encode('ascii'), dtype=np.uint8)
+    return lookup[data].reshape(len(grids), nboxes)
+
+
+def array_to_grids(masks, topo=None):
+    """Convert a (K, boxes) mask array into grid strings, with '.' for unsolved boxes."""
+    _require_numpy()
+    topo = topo or diagonal
+    lookup = np.full(1 << topo.size, ord('.'), dtype=np.uint8)
+    for d, m in topo.digit_mask.items():
+        lookup[m] = ord(d)
+    text = lookup[masks].tobytes().decode('ascii')
+    n = len(topo.boxes)
+    return [text[k * n:(k + 1) * n] for k in range(len(masks))]
+
+
+def _step(masks, topo):
+    """
+    Run one eliminate + only_choice pass over a (K, boxes) array.
+    Returns:
+        The new array. Boards with a contradiction have at least one zero mask.
+    """
+    peers, units, slots, counts = _index_arrays(topo)
+    k, nboxes = masks.shape
+    size = topo.size
+    zero = np.zeros((k, 1), dtype=masks.dtype)
+
+    # Eliminate: clear the digits of every solved peer
+    solved = np.where(counts[masks] == 1, masks, 0)
+    taken = np.bitwise_or.reduce(np.concatenate([solved, zero], axis=1)[:, peers], axis=2)
+    masks = masks & ~taken
+
+    # Only choice: digits that appear in exactly one box of a unit
+    in_unit = masks[:, units]
+    bits = (in_unit[..., None] >> np.arange(size, dtype=masks.dtype)) & 1
+    per_digit = bits.sum(axis=2, dtype=np.uint8)
+    weights = (1 << np.arange(size)).astype(masks.dtype)
+    singles = ((per_digit == 1) * weights).sum(axis=2).astype(masks.dtype)
+    missing = ((per_digit == 0) * weights).sum(axis=2).astype(masks.dtype)
+    hits = (in_unit & singles[..., None]).reshape(k, -1)
+    hits = np.bitwise_or.reduce(np.concatenate([hits, zero], axis=1)[:, slots], axis=2)
+    masks = np.where(hits != 0, hits, masks)
+    # A box holding two hidden singles is a contradiction, so it empties out
+    masks[counts[hits] > 1] = 0
+    # A digit with nowhere to go in a unit is a contradiction too
+    masks[missing.any(axis=1)] = 0
+    return masks
+
+
+def propagate_batch(masks, topo=None):
+    """
+    Propagate every board of a (K, boxes) mask array until none of them change.
+    Returns:
+        (masks, status): the propagated array and an int8 array per board holding
+        1 for solved, 0 for needs search and -1 for a contradiction.
+    """
+    _require_numpy()
+    topo = topo or diagonal
+    peers, units, slots, counts = _index_arrays(topo)
+    masks = np.array(masks, dtype=np.uint16)
+    status = np.zeros(len(masks), dtype=np.int8)
+    active = np.arange(len(masks))
+    while len(active):
+        before = masks[active]
+        after = _step(before, topo)
+        masks[active] = after
+        dead = (after == 0).any(axis=1)
+        changed = (after != before).any(axis=1)
+        # A board only counts as solved once a pass has checked its last assignments
+        done = (counts[after] == 1).all(axis=1) & ~changed & ~dead
+        status[active[dead]] = -1
+        status[active[done]] = 1
+        active = active[changed & ~dead]
+    return masks, status
+
+
+def solve_batch(grids, topo=None, stats=None):
+    """
+    Solve a list of grids, propagating them all at once and searching the rest one by one.
+    Args:
+        stats(SolverStats): optional stats.SolverStats for the boards that need search.
+    Returns:
+        A list with the solved grid string, or False, for every input grid.
+    """
+    topo = topo or diagonal
+    if not grids:
+        return []
+    masks, status = propagate_batch(grids_to_array(grids, topo), topo)
+    results = array_to_grids(masks, topo)
+    for k in np.flatnonzero(status != 1):
+        if status[k] < 0:
+            results[k] = False
+            continue
+        solved = bitboard.search([int(m) for m in masks[k]], topo, stats)
+        results[k] = solved and bitboard.masks_to_grid(solved, topo)
+    return results
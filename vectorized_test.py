@@ -0,0 +1,51 @@
+import bitboard
+import unittest
+
+import batch
+import batch_test
+import topology_test
+import vectorized
+from topology import get_topology
+
+
+@unittest.skipUnless(vectorized.np is not None, 'NumPy is not installed')
+class TestVectorized(unittest.TestCase):
+    grids = batch_test.TestSolveMany.grids
+
+    def test_round_trip(self):
+        array = vectorized.grids_to_array(self.grids)
+        self.assertEqual(array.shape, (len(self.grids), 81))
+        self.assertEqual(vectorized.array_to_grids(array), [g.replace('0', '.') for g in self.grids])
+        self.assertEqual(list(array[0]), bitboard.grid_masks(self.grids[0]))
+
+    def test_grid_lengths(self):
+        grid = self.grids[0]
+        for grids in ([grid[:80], grid + '.'], [grid, grid + '.'], [grid[:80]]):
+            with self.assertRaises(ValueError):
+                vectorized.solve_batch(grids)
+
+    def test_propagate_status(self):
+        solved = bitboard.solve_grid(self.grids[0])
+        grids = [solved, solved[:-1] + '.', '11' + '.' * 79, self.grids[0]]
+        masks, status = vectorized.propagate_batch(vectorized.grids_to_array(grids))
+        self.assertEqual(list(status[:3]), [1, 1, -1])
+        self.assertEqual(vectorized.array_to_grids(masks[:2]), [solved, solved])
+
+    def test_solve_batch(self):
+        self.assertEqual(vectorized.solve_batch(self.grids), [batch.solve_grid(g) for g in self.grids])
+
+    def test_other_topology(self):
+        topo = get_topology(4, diagonals=False)
+        solved = bitboard.solve_grid('.' * 256, topo)
+        grid = solved[:100] + '.' * 50 + solved[150:]
+        result = vectorized.solve_batch([grid], topo)[0]
+        self.assertTrue(topology_test.is_valid(result, topo))
+        self.assertEqual((result[:100], result[150:]), (solved[:100], solved[150:]))
+
+    def test_batch_engine(self):
+        results = list(batch.solve_many(self.grids, workers=1, chunksize=4, engine='numpy'))
+        self.assertEqual(results, batch_test.TestSolveMany().expected())
+
+
+if __name__ == '__main__':
+    unittest.main()